@@ -5,23 +5,36 @@ import warnings
 import threading
 import re
 import jwt
+import time
 import socket
+import mimetypes
+import base64
+import json
 
 from uuid import uuid4
-from flask import Flask, request, render_template, send_from_directory, jsonify, send_file, Response, abort, redirect, url_for, session
+from flask import Flask, request, render_template, send_from_directory, jsonify, send_file, Response, abort, redirect, url_for, session, g
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from functools import wraps
+from itertools import chain
 from waitress import serve
 from datetime import timedelta, datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import asc, desc
 from dotenv import load_dotenv
 load_dotenv()
 
 # dir modules
-from database_utils import DB, create_localdb, update_id
+from database_utils import DB, CONTINUE_WATCHING_LIMIT, create_localdb, update_id, on_library_change, start_query_stats, stop_query_stats, slow_query_logger
 from library_manager import sync_libraries, create_settings, load_settings
 from tmdb_client import TMDBClient
+from resource_governor import governor
+from search_index import autocomplete_index
+from browse_index import browse_index
+from playback_buffer import playback_buffer
+from response_cache import response_cache, conditional, etag_matches, not_modified, CACHE_CONTROL
+from json_stream import Rows, array, document, lines, stream_response, wants_ndjson
+from compression import compress_response, precompress_static, static_variant, negotiate, STATIC_EXTENSIONS
 
 
 logging.basicConfig(
@@ -33,6 +46,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+slow_query_handler = logging.FileHandler('slow_queries.log', encoding='utf-8') # also in logs.log
+slow_query_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p'))
+slow_query_logger.addHandler(slow_query_handler)
+
 
 
 flask_key = os.getenv('FLASK_KEY')
@@ -40,7 +57,8 @@ if not flask_key:
     logger.critical("Missing FLASK_KEY in environment. Cannot start the app.")
     sys.exit(1)
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None) # /static is served by send_static()
+STATIC_FOLDER = os.path.join(app.root_path, 'static')
 app.secret_key = flask_key
 app.config.update(
     PERMANENT_SESSION_LIFETIME = timedelta(days=182),
@@ -54,6 +72,116 @@ app.config.update(
 warnings.filterwarnings("ignore", category=UserWarning, module="flask_limiter") # supress "Using the in-memory storage for tracking rate limits as no storage"
 limiter = Limiter(get_remote_address, app=app, default_limits=[])
 tight_rate, default_rate, loose_rate = '30/minute', '60/minute', '120/minute'
+BATCH_LIMIT = 100 # max ids of one ?ids= batch request
+CATALOG_PAGE_LIMIT = 100 # max cards of one catalog page
+CATALOG_SORTS = {'newest': ('new_video_inserted', desc), 'title': ('title', asc)} # ?sort= of the catalog lists
+
+
+
+
+
+
+
+## REQUEST TIMING
+## REQUEST TIMING
+## REQUEST TIMING
+
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    g.query_stats = start_query_stats()
+
+
+@app.after_request
+def compress_api_response(response):
+    return compress_response(response, request.accept_encodings)
+
+
+@app.after_request
+def add_server_timing(response):
+    stats = g.pop('query_stats', None)
+    start = g.pop('request_start', None)
+    stop_query_stats()
+    if stats is None or start is None:
+        return response
+
+    total = (time.perf_counter() - start) * 1000
+    db_time = stats['time'] * 1000
+    response.headers['Server-Timing'] = f'db;dur={db_time:.1f};desc="{stats["count"]} queries", app;dur={total - db_time:.1f}, total;dur={total:.1f}'
+    logger.debug(f'{request.method} {request.path} -> {response.status_code}: {stats["count"]} queries, db {db_time:.1f} ms, total {total:.1f} ms')
+    return response
+
+
+
+
+
+
+
+## AUTOCOMPLETE INDEX
+## AUTOCOMPLETE INDEX
+## AUTOCOMPLETE INDEX
+
+def autocomplete_entries(ids: list[int] = None):
+    terms = DB.fetch_search_terms(ids)
+    return {id: {'title': title, 'media_type': category, 'terms': terms.get(id, [])} for id, title, category in DB.fetch_catalog_index(ids)}
+
+
+def load_autocomplete_index():
+    autocomplete_index.build(autocomplete_entries())
+
+
+@on_library_change
+def update_autocomplete_index(media_ids: list[int], deleted: bool):
+    if deleted:
+        autocomplete_index.remove(media_ids)
+    else:
+        autocomplete_index.update(autocomplete_entries(media_ids))
+
+
+
+
+
+
+
+## BROWSE INDEX
+## BROWSE INDEX
+## BROWSE INDEX
+
+def browse_entries(ids: list[int] = None):
+    return {id: {'title': title, 'category': category} for id, title, category in DB.fetch_catalog_index(ids)}
+
+
+def load_browse_index():
+    browse_index.build(browse_entries())
+
+
+@on_library_change
+def update_browse_index(media_ids: list[int], deleted: bool):
+    if not browse_index.ready:
+        return
+    if deleted:
+        browse_index.remove(media_ids)
+    else:
+        browse_index.update(browse_entries(media_ids))
+
+
+
+
+
+
+
+## RESPONSE CACHE
+## RESPONSE CACHE
+## RESPONSE CACHE
+
+@on_library_change
+def invalidate_response_cache(media_ids: list[int], deleted: bool):
+    response_cache.invalidate(media_ids)
+
+
+def today() -> str:
+    # responses depending on the date (upcoming episodes) are cached per day
+    return datetime.today().date().isoformat()
 
 
 
@@ -237,39 +365,241 @@ def ratelimit_handler(e):
 ## API CONTENT Endpoints
 ## API CONTENT Endpoints
 ## API CONTENT Endpoints
+def item_json(item, details, next_episode=None) -> dict:
+    """
+    /content/v1/item document of a MediaItem (genres and logos loaded), `details` its MovieDetails / TvDetails.
+    """
+    data = {
+        "id": item.id,
+        "media_type": item.media_type,
+        "tmdb_id": item.tmdb_id,
+        "title": item.title,
+        "original_title": item.original_title,
+        "release_date": item.release_date,
+        "tagline": item.tagline,
+        "overview": item.overview,
+        "backdrop_path": item.backdrop_path,
+        "poster_path": item.poster_path,
+        "homepage": item.homepage,
+        "popularity": item.popularity,
+        "vote_average": item.vote_average,
+        "vote_count": item.vote_count,
+        "status": item.status,
+        "entry_updated": item.entry_updated,
+        "genres": [g.name for g in item.genres],
+        "logos": [{'lang': l.lang, 'file_path': l.file_path} for l in item.logos],
+    }
+
+    if item.media_type == 'movie':
+        data.update({
+            "budget": details.budget if details else None,
+            "revenue": details.revenue if details else None,
+            "runtime": details.runtime if details else None
+        })
+    elif item.media_type == 'tv':
+        data.update({
+            "entry_created": item.entry_created,
+            "next_episode": {'air_date': next_episode.air_date, 
+                             'season_number': next_episode.season_number, 
+                             'episode_number': next_episode.episode_number,
+                             'name': next_episode.name} if next_episode else {},
+            "first_air_date": details.first_air_date if details else None,
+            "last_air_date": details.last_air_date if details else None,
+            "number_of_seasons": details.number_of_seasons if details else None,
+            "number_of_episodes": details.number_of_episodes if details else None
+        })
+    return data
+
+
+def videos_json(videos, episodes) -> list[dict]:
+    """
+    /content/v1/item/<id>/videos document of VideoMetadata rows (subtitles loaded) and their TvEpisodes.
+    """
+    episode_map = {
+        (ep.season_number, ep.episode_number): ep for ep in episodes
+    }
+
+    result = []
+    for v in videos:
+        # Basic metadata
+        metadata = {
+            "key_frame": v.keyframe_path,
+            "resolution": v.resolution,
+            "extension": v.extension,
+            "audio_codec": v.audio_codec,
+            "video_codec": v.video_codec,
+            "duration": v.duration,
+            "frame_rate": v.frame_rate,
+            "width": v.width,
+            "height": v.height,
+            "aspect_ratio": v.aspect_ratio,
+        }
+        if v.season_number:
+            metadata.update({
+                "season_number": v.season_number,
+                "episode_number": v.episode_number,
+            })
+
+        # Subtitles
+        subtitles = [{
+            "id": s.id,
+            "lang": s.lang,
+            "label": s.label,
+        } for s in v.subtitles]
+
+        video_data = {
+            "id": v.id,
+            "media_id": v.media_id,
+            "season_number": v.season_number,
+            "episode_number": v.episode_number,
+            "metadata": metadata,
+            "subtitles": subtitles,
+        }
+
+        # Add episode data if it exists
+        if v.season_number and v.episode_number:
+            ep = episode_map.get((v.season_number, v.episode_number))
+            if ep:
+                video_data.update({
+                    "air_date": ep.air_date,
+                    "episode_type": ep.episode_type,
+                    "name": ep.name,
+                    "overview": ep.overview,
+                    "runtime": ep.runtime,
+                    "still_path": ep.still_path,
+                    "vote_average": ep.vote_average,
+                    "vote_count": ep.vote_count
+                })
+
+        result.append(video_data)
+
+    return result
+
+
+def video_json(video, episode=None, item=None) -> dict:
+    """
+    /content/v1/video document of a VideoMetadata row (subtitles loaded), `episode` its TvEpisode,
+    `item` its MediaItem (used for the name of movies).
+    """
+    metadata = {
+        "key_frame": video.keyframe_path,
+        "resolution": video.resolution,
+        "extension": video.extension,
+        "audio_codec": video.audio_codec,
+        "video_codec": video.video_codec,
+        "duration": video.duration,
+        "frame_rate": video.frame_rate,
+        "width": video.width,
+        "height": video.height,
+        "aspect_ratio": video.aspect_ratio,
+    }
+
+    if video.season_number:
+        metadata.update({
+            "season_number": video.season_number,
+            "episode_number": video.episode_number,
+        })
+
+    data = {
+        "id": video.id,
+        "media_id": video.media_id,
+        "hash_key": video.hash_key,
+        "metadata": metadata,
+        "subtitles": [{
+            "id": s.id,
+            "lang": s.lang,
+            "label": s.label,
+            "hash_key": s.hash_key
+        } for s in video.subtitles]
+    }
+
+    if video.season_number or video.episode_number:
+        if episode:
+            episode_data = {
+                'season_number': video.season_number,
+                'episode_number': video.episode_number,
+                'air_date': episode.air_date,
+                'episode_type':episode.episode_type,
+                'name':episode.name,
+                'overview':episode.overview,
+                'runtime':episode.runtime,
+                'still_path':episode.still_path,
+                'vote_average':episode.vote_average,
+                'vote_count':episode.vote_count
+            }   
+            data.update(episode_data)
+    elif item:
+        data.update({'name': item.title})
+
+    return data
+
+
 @app.route('/content/v1/index')
 @token_required
 def get_index(): 
-    try:
-        index = DB.fetch_catalog_index()
-    except Exception as e:
-        logger.error(f'failed to fetch index, exception {e}.', exc_info=True)
-        return jsonify({'error': 'internal error.'}), 400
+    # titles by letter, served from the pre-serialized browse index
+    if not browse_index.ready:
+        try:
+            load_browse_index()
+        except Exception as e:
+            logger.error(f'failed to fetch index, exception {e}.', exc_info=True)
+            return jsonify({'error': 'internal error.'}), 400
 
-    library = dict()
-    for id, title, category in index:
-        letter = title[0]
+    encoding = negotiate(request.accept_encodings)
+    body, etag = browse_index.body(encoding)
+    matched = etag_matches(etag)
+    if matched:
+        return not_modified(matched)
 
-        if letter not in library:
-            library[letter] = [{'id': id, 'title': title, 'category':category}]
-        else:
-            library[letter].append({'id': id, 'title': title, 'category':category})
+    response = Response(body, mimetype='application/json')
+    if encoding: # compressed once per change, compress_api_response() leaves it alone
+        response.headers['Content-Encoding'] = encoding
+        etag = f'{etag}-{encoding}'
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
 
-    library = dict(sorted(library.items()))
-    for letter in library:
-        library[letter].sort(key=lambda x: x['title'])
-    return jsonify(library)
 
+def encode_cursor(value, id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, id]).encode()).decode().rstrip('=')
 
-@app.route('/content/v1/catalog')
-@token_required
-def get_catalog(): 
+
+def decode_cursor(cursor: str) -> tuple | None:
+    # (value, id) of an X-Next-Cursor, None if malformed
+    try:
+        value, id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(id, int) or not (value is None or isinstance(value, (str, int))):
+        return None
+    return value, id
+
+
+def catalog_page(default_limit: int, media_type: str = None):
+    """
+    One page of catalog cards, ordered by ?sort= (CATALOG_SORTS, newest first by default).
+    ?limit= sets the page size (up to CATALOG_PAGE_LIMIT), ?cursor= the X-Next-Cursor header of the previous
+    page, which is only set when there are more cards.
+    """
+    sort = request.args.get('sort', 'newest')
+    limit = request.args.get('limit', default_limit, type=int)
+    cursor = request.args.get('cursor')
+
+    if sort not in CATALOG_SORTS or not limit or not (1 <= limit <= CATALOG_PAGE_LIMIT):
+        return jsonify({'error': 'invalid data.'}), 400
+
+    after = decode_cursor(cursor) if cursor else None
+    if cursor and not after:
+        return jsonify({'error': 'invalid cursor.'}), 400
+
+    order_by, order_ = CATALOG_SORTS[sort]
     try:
-        catalog = DB.fetch_catalog(order_by='new_video_inserted', limit=50)
+        catalog = DB.fetch_catalog_cards(order_by=order_by, order_=order_, limit=limit + 1, media_type=media_type, after=after)
     except Exception as e:
-        logger.error(f'failed to fetch catalog, exception {e}.', exc_info=True)
+        logger.error(f'failed to fetch {media_type or "full"} catalog, exception {e}.', exc_info=True)
         return jsonify({'error': 'internal error.'}), 400
-    
+
     data = [{'id': item.id, 
              'media_type': item.media_type,
              'tmdb': item.tmdb_id,
@@ -279,59 +609,43 @@ def get_catalog():
              'poster_path': item.poster_path,
              'entry_updated': item.entry_updated,
              'newest_video': item.new_video_inserted
-             } for item in catalog]
+             } for item in catalog[:limit]]
 
-    return jsonify(data)
+    response = jsonify(data)
+    if len(catalog) > limit:
+        last = catalog[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(getattr(last, order_by), last.id)
+    return response
+
+
+@app.route('/content/v1/catalog')
+@token_required
+@response_cache.cached()
+@conditional(DB.fetch_library_version)
+def get_catalog(): 
+    return catalog_page(50)
 
 
 @app.route('/content/v1/tv')
 @token_required
+@response_cache.cached()
+@conditional(DB.fetch_library_version)
 def get_catalog_tv():
-    try:
-        catalog = DB.fetch_catalog(order_by='new_video_inserted', media_type='tv')
-    except Exception as e:
-        logger.error(f'failed to fetch tv catalog, exception {e}.', exc_info=True)
-        return jsonify({'error': 'internal error.'}), 400
-    
-    data = [{'id': item.id, 
-             'media_type': item.media_type,
-             'tmdb': item.tmdb_id,
-             'title': item.title,
-             'original_title': item.original_title,
-             'release_date': item.release_date,
-             'poster_path': item.poster_path,
-             'entry_updated': item.entry_updated,
-             'newest_video': item.new_video_inserted
-             } for item in catalog]
-
-    return jsonify(data)
+    return catalog_page(20, media_type='tv')
 
 
 @app.route('/content/v1/movies')
 @token_required
+@response_cache.cached()
+@conditional(DB.fetch_library_version)
 def get_catalog_movies():
-    try:
-        catalog = DB.fetch_catalog(order_by='new_video_inserted', media_type='movie')
-    except Exception as e:
-        logger.error(f'failed to fetch movies catalog, exception {e}.', exc_info=True)
-        return jsonify({'error': 'internal error.'}), 400
-        
-    data = [{'id': item.id, 
-             'media_type': item.media_type,
-             'tmdb': item.tmdb_id,
-             'title': item.title,
-             'original_title': item.original_title,
-             'release_date': item.release_date,
-             'poster_path': item.poster_path,
-             'entry_updated': item.entry_updated,
-             'newest_video': item.new_video_inserted
-             } for item in catalog]
-
-    return jsonify(data)
+    return catalog_page(20, media_type='movie')
 
 
 @app.route('/content/v1/item/<int:item_id>')
 @token_required
+@response_cache.cached(tag='item_id', vary=today)
+@conditional(DB.fetch_item_version, 'item_id', vary=today)
 def get_item(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -346,72 +660,12 @@ def get_item(item_id):
 
     if item and item.media_type == 'movie':
         item_ = DB.fetch_movie_details(item_id)  # refresh item.movie_details
-        data = {
-            "id": item.id,
-            "media_type": item.media_type,
-            "tmdb_id": item.tmdb_id,
-            "title": item.title,
-            "original_title": item.original_title,
-            "release_date": item.release_date,
-            "tagline": item.tagline,
-            "overview": item.overview,
-            "backdrop_path": item.backdrop_path,
-            "poster_path": item.poster_path,
-            "homepage": item.homepage,
-            "popularity": item.popularity,
-            "vote_average": item.vote_average,
-            "vote_count": item.vote_count,
-            "status": item.status,
-            "entry_updated": item.entry_updated,
-            "genres": [g.name for g in item.genres],
-            "logos": [{'lang': l.lang, 'file_path': l.file_path} for l in item.logos],
-
-            "budget": item_.movie_details.budget if item_.movie_details else None,
-            "revenue": item_.movie_details.revenue if item_.movie_details else None,
-            "runtime": item_.movie_details.runtime if item_.movie_details else None
-        }
-        return jsonify(data)
+        return jsonify(item_json(item, item_.movie_details))
     
     elif item and item.media_type == 'tv':
         item_ = DB.fetch_tv_details(item_id)
-        episodes = DB.fetch_episodes(item_id)
-        
-        today = datetime.today().date()
-        future_eps = [ep for ep in episodes if datetime.strptime(ep.air_date, "%Y-%m-%d").date() > today]
-        
-        next_episode = min(future_eps, key=lambda ep: datetime.strptime(ep.air_date, "%Y-%m-%d")) if future_eps else None
-        next_ep_data = {'air_date': next_episode.air_date, 
-                        'season_number': next_episode.season_number, 
-                        'episode_number': next_episode.episode_number,
-                        'name': next_episode.name} if next_episode else {}
-        data = {
-            "id": item.id,
-            "media_type": item.media_type,
-            "tmdb_id": item.tmdb_id,
-            "title": item.title,
-            "original_title": item.original_title,
-            "release_date": item.release_date,
-            "tagline": item.tagline,
-            "overview": item.overview,
-            "backdrop_path": item.backdrop_path,
-            "poster_path": item.poster_path,
-            "homepage": item.homepage,
-            "popularity": item.popularity,
-            "vote_average": item.vote_average,
-            "vote_count": item.vote_count,
-            "status": item.status,
-            "entry_created": item.entry_created,
-            "entry_updated": item.entry_updated,
-            "genres": [g.name for g in item.genres],
-            "logos": [{'lang': l.lang, 'file_path': l.file_path} for l in item.logos],
-
-            "next_episode": next_ep_data,
-            "first_air_date": item_.tv_details.first_air_date if item_.tv_details else None,
-            "last_air_date": item_.tv_details.last_air_date if item_.tv_details else None,
-            "number_of_seasons": item_.tv_details.number_of_seasons if item_.tv_details else None,
-            "number_of_episodes": item_.tv_details.number_of_episodes if item_.tv_details else None
-        }
-        return jsonify(data)
+        next_episode = DB.fetch_next_episode(item_id, today())
+        return jsonify(item_json(item, item_.tv_details, next_episode))
     
     else:
         return jsonify({"error": "Item not found"}), 404
@@ -419,6 +673,8 @@ def get_item(item_id):
 
 @app.route('/content/v1/item/<int:item_id>/genres')
 @token_required
+@response_cache.cached(tag='item_id')
+@conditional(DB.fetch_item_version, 'item_id')
 def get_item_genres(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -439,6 +695,8 @@ def get_item_genres(item_id):
 
 @app.route('/content/v1/item/<int:item_id>/ratings')
 @token_required
+@response_cache.cached(tag='item_id')
+@conditional(DB.fetch_item_version, 'item_id')
 def get_item_ratings(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -459,6 +717,8 @@ def get_item_ratings(item_id):
 
 @app.route('/content/v1/item/<int:item_id>/cast')
 @token_required
+@response_cache.cached(tag='item_id')
+@conditional(DB.fetch_item_version, 'item_id')
 def get_item_cast(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -506,6 +766,8 @@ def get_item_cast(item_id):
 
 @app.route('/content/v1/item/<int:item_id>/trailers')
 @token_required
+@response_cache.cached(tag='item_id')
+@conditional(DB.fetch_item_version, 'item_id')
 def get_item_trailers(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -535,6 +797,8 @@ def get_item_trailers(item_id):
 
 @app.route('/content/v1/item/<int:item_id>/networks')
 @token_required
+@response_cache.cached(tag='item_id')
+@conditional(DB.fetch_item_version, 'item_id')
 def get_item_networks(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -559,6 +823,7 @@ def get_item_networks(item_id):
 
 @app.route('/content/v1/item/<int:item_id>/seasons')
 @token_required
+@conditional(DB.fetch_item_version, 'item_id')
 def get_item_seasons(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -566,22 +831,22 @@ def get_item_seasons(item_id):
 
 
     try:
-        seasons = DB.fetch_season(item_id)
+        seasons = DB.iter_seasons(item_id)
+        first = next(seasons, None)
     except Exception as e:
         logger.error(f'failed to fetch seasons for item (ID {item_id}), exception {e}.', exc_info=True)
         return jsonify({'error': 'internal error.'}), 400
         
-    if not seasons:
+    if not first:
         return jsonify({"error": "item not found"}), 404
-    
-    result = []
-    for s in seasons:
-        season_data = {
-            "season_number": s.season_number,
-            "name": s.name,
-            "overview": s.overview,
-            "poster_path": s.poster_path,
-            "episode_count": s.episode_count,
+
+    def season_json(season, episodes):
+        return {
+            "season_number": season.season_number,
+            "name": season.name,
+            "overview": season.overview,
+            "poster_path": season.poster_path,
+            "episode_count": season.episode_count,
             "episodes": [{
                 "id": e.id,
                 "media_id": e.media_id,
@@ -596,15 +861,19 @@ def get_item_seasons(item_id):
                 "runtime": e.runtime,
                 "vote_average": e.vote_average,
                 "vote_count": e.vote_count
-                } for e in s.episodes]
+                } for e in episodes]
         }
-        result.append(season_data)
 
-    return jsonify(result)
+    # one season at a time from the database cursor, ?format=ndjson sends one line per season
+    results = (season_json(season, episodes) for season, episodes in chain([first], seasons))
+    ndjson = wants_ndjson()
+    return stream_response(lines(results) if ndjson else array(results), ndjson)
 
 
 @app.route('/content/v1/item/<int:item_id>/episodes')
 @token_required
+@response_cache.cached(tag='item_id')
+@conditional(DB.fetch_item_version, 'item_id')
 def get_item_episodes(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -639,6 +908,8 @@ def get_item_episodes(item_id):
 
 @app.route('/content/v1/item/<int:item_id>/videos')
 @token_required
+@response_cache.cached(tag='item_id')
+@conditional(DB.fetch_item_version, 'item_id')
 def get_videos(item_id):
     if not item_id or not isinstance(item_id, int) or item_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400
@@ -654,71 +925,64 @@ def get_videos(item_id):
     if not videos:
         return jsonify({"error": "item not found"}), 404
 
-    # Preload all episodes for this item and map by (season_number, episode_number)
-    episodes = DB.fetch_episodes(item_id)
-    episode_map = {
-        (ep.season_number, ep.episode_number): ep for ep in episodes
-    }
+    # Preload the episodes of these videos and map by (season_number, episode_number)
+    episodes = DB.fetch_episodes_by_number(item_id, [(v.season_number, v.episode_number) for v in videos])
+    return jsonify(videos_json(videos, episodes))
 
-    result = []
-    for v in videos:
-        # Basic metadata
-        metadata = {
-            "key_frame": v.keyframe_path,
-            "resolution": v.resolution,
-            "extension": v.extension,
-            "audio_codec": v.audio_codec,
-            "video_codec": v.video_codec,
-            "duration": v.duration,
-            "frame_rate": v.frame_rate,
-            "width": v.width,
-            "height": v.height,
-            "aspect_ratio": v.aspect_ratio,
-        }
-        if v.season_number:
-            metadata.update({
-                "season_number": v.season_number,
-                "episode_number": v.episode_number,
-            })
 
-        # Subtitles
-        subtitles = [{
-            "id": s.id,
-            "lang": s.lang,
-            "label": s.label,
-        } for s in v.subtitles]
+@app.route('/content/v1/item/<int:item_id>/page')
+@token_required
+def get_item_page(item_id):
+    # everything the title page needs in one document: item, ratings, networks, videos and the user's state of this title
+    if not item_id or not isinstance(item_id, int) or item_id <= 0:
+        return jsonify({'error': 'invalid data.'}), 400
 
-        video_data = {
-            "id": v.id,
-            "media_id": v.media_id,
-            "season_number": v.season_number,
-            "episode_number": v.episode_number,
-            "metadata": metadata,
-            "subtitles": subtitles,
-        }
+    key = session.get('key')
 
-        # Add episode data if it exists
-        if v.season_number and v.episode_number:
-            ep = episode_map.get((v.season_number, v.episode_number))
-            if ep:
-                video_data.update({
-                    "air_date": ep.air_date,
-                    "episode_type": ep.episode_type,
-                    "name": ep.name,
-                    "overview": ep.overview,
-                    "runtime": ep.runtime,
-                    "still_path": ep.still_path,
-                    "vote_average": ep.vote_average,
-                    "vote_count": ep.vote_count
-                })
+    if not key or not isinstance(key, str):
+        return jsonify({'error': 'invalid session key'}), 400
 
-        result.append(video_data)
 
-    return jsonify(result)
+
+    try:
+        item, episodes = DB.fetch_item_page(item_id)
+        library, playback = DB.fetch_user_media_state(key, item_id) if item else (None, [])
+    except Exception as e:
+        logger.error(f'failed to fetch page of item (ID {item_id}), exception {e}.', exc_info=True)
+        return jsonify({'error': 'internal error.'}), 400
+
+    if not item:
+        return jsonify({"error": "item not found"}), 404
+
+    next_episode = DB.fetch_next_episode(item_id, today()) if item.media_type == 'tv' else None
+    details = item.movie_details if item.media_type == 'movie' else item.tv_details
+
+    progress = [{'media_id': p.media_id, 'video_id': p.video_id, 'watched': p.watched, 'paused_at': p.paused_at, 'duration': p.video_duration, 'entry_updated': p.entry_updated} for p in playback]
+    playback_buffer.overlay(key, progress, media_id=item_id)
+    progress = {p['video_id']: p for p in progress}
+
+    videos = videos_json(item.media_metadata, episodes)
+    for video in videos:
+        state = progress.get(video['id'])
+        if state:
+            video.update({'watched': state['watched'], 'paused_at': state['paused_at'], 'duration': state['duration']})
+
+    return jsonify({
+        'item': item_json(item, details, next_episode),
+        'ratings': [{"id": r.id, "rating": r.rating, "country": r.country} for r in item.content_ratings],
+        'networks': [{"id": n.id, "name": n.name, "logo_path": n.logo_path, "origin_country": n.origin_country} for n in item.networks],
+        'videos': videos,
+        'account': {
+            'rated': library.rated if library else 0,
+            'watchlisted': library.watchlisted if library else 0
+        }
+    })
 
 
 @app.route('/content/v1/video/<int:video_id>')
 @token_required
+@response_cache.cached()
+@conditional(DB.fetch_video_version, 'video_id')
 def get_video(video_id):
     if not video_id or not isinstance(video_id, int) or video_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400  
@@ -735,70 +999,19 @@ def get_video(video_id):
         return jsonify({"error": "item not found"}), 404
     
 
-    metadata = {
-        "key_frame": video.keyframe_path,
-        "resolution": video.resolution,
-        "extension": video.extension,
-        "audio_codec": video.audio_codec,
-        "video_codec": video.video_codec,
-        "duration": video.duration,
-        "frame_rate": video.frame_rate,
-        "width": video.width,
-        "height": video.height,
-        "aspect_ratio": video.aspect_ratio,
-    }
-
-    if video.season_number:
-        metadata.update({
-            "season_number": video.season_number,
-            "episode_number": video.episode_number,
-        })
-
-    data = {
-        "id": video.id,
-        "media_id": video.media_id,
-        "hash_key": video.hash_key,
-        "metadata": metadata,
-        "subtitles": [{
-            "id": s.id,
-            "lang": s.lang,
-            "label": s.label,
-            "hash_key": s.hash_key
-        } for s in video.subtitles]
-    }
-
+    episode, item = None, None
     if video.season_number or video.episode_number:
-        episode = DB.fetch_episode(video.media_id, video.season_number, video.episode_number) 
-        
-        if episode:  
-            episode_data = {
-                'season_number': video.season_number,
-                'episode_number': video.episode_number,
-                'air_date': episode.air_date,
-                'episode_type':episode.episode_type,
-                'name':episode.name,
-                'overview':episode.overview,
-                'runtime':episode.runtime,
-                'still_path':episode.still_path,
-                'vote_average':episode.vote_average,
-                'vote_count':episode.vote_count
-            }   
-            data.update(episode_data)
+        episode = DB.fetch_episode(video.media_id, video.season_number, video.episode_number)
     else:
-        moviedets = DB.fetch_id(data.get('media_id'))
-
-        if moviedets:
-            extra_d = {
-                'name': moviedets.title,
+        item = DB.fetch_id(video.media_id)
 
-            }
-            data.update(extra_d)
-
-    return jsonify(data)
+    return jsonify(video_json(video, episode, item))
 
 
 @app.route('/content/v1/video/<int:video_id>/subtitles')
 @token_required
+@response_cache.cached()
+@conditional(DB.fetch_video_version, 'video_id')
 def get_video_subtitles(video_id):
     if not video_id or not isinstance(video_id, int) or video_id <= 0:
         return jsonify({'error': 'invalid data.'}), 400  
@@ -822,8 +1035,162 @@ def get_video_subtitles(video_id):
                         } for s in subtitles])
 
 
+
+def batch_ids() -> list[int] | None:
+    # ?ids=1,2,3 as unique positive ints in request order, None if malformed or over BATCH_LIMIT
+    raw = request.args.get('ids', '')
+    try:
+        ids = list(dict.fromkeys(int(id) for id in raw.split(',') if id.strip()))
+    except ValueError:
+        return None
+    if not ids or len(ids) > BATCH_LIMIT or any(id <= 0 for id in ids):
+        return None
+    return ids
+
+
+@app.route('/content/v1/items')
+@token_required
+@response_cache.cached(vary=today)
+def get_items():
+    # /content/v1/item documents of several titles, keyed by id. missing ids are left out
+    ids = batch_ids()
+    if not ids:
+        return jsonify({'error': f'invalid data. expected ?ids= with 1 to {BATCH_LIMIT} ids.'}), 400
+
+
+
+    try:
+        items, next_episodes = DB.fetch_items(ids, today())
+    except Exception as e:
+        logger.error(f'failed to fetch items {ids}, exception {e}.', exc_info=True)
+        return jsonify({'error': 'internal error.'}), 400
+
+    data = {}
+    for id in ids:
+        item = items.get(id)
+        if item:
+            details = item.movie_details if item.media_type == 'movie' else item.tv_details
+            data[str(id)] = item_json(item, details, next_episodes.get(id))
+    return jsonify(data)
+
+
+@app.route('/content/v1/videos')
+@token_required
+@response_cache.cached()
+def get_videos_batch():
+    # /content/v1/video documents of several videos, keyed by id. missing ids are left out
+    ids = batch_ids()
+    if not ids:
+        return jsonify({'error': f'invalid data. expected ?ids= with 1 to {BATCH_LIMIT} ids.'}), 400
+
+
+
+    try:
+        videos, episodes, items = DB.fetch_videos_by_ids(ids)
+    except Exception as e:
+        logger.error(f'failed to fetch videos {ids}, exception {e}.', exc_info=True)
+        return jsonify({'error': 'internal error.'}), 400
+
+    data = {}
+    for id in ids:
+        video = videos.get(id)
+        if video:
+            episode = episodes.get((video.media_id, video.season_number, video.episode_number))
+            data[str(id)] = video_json(video, episode, items.get(video.media_id))
+    return jsonify(data)
+
+@app.route('/content/v1/video/<int:video_id>/start')
+@token_required
+def get_playback_session(video_id):
+    # everything the watch page needs before the player starts: stream, subtitles, resume position, episode and its neighbours
+    if not video_id or not isinstance(video_id, int) or video_id <= 0:
+        return jsonify({'error': 'invalid data.'}), 400
+
+    key = session.get('key')
+
+    if not key or not isinstance(key, str):
+        return jsonify({'error': 'invalid session key'}), 400
+
+
+
+    try:
+        playback_session = DB.fetch_playback_session(video_id, key)
+    except Exception as e:
+        logger.error(f'failed to fetch playback session of video (ID {video_id}), exception {e}.', exc_info=True)
+        return jsonify({'error': 'internal error.'}), 400
+
+    if not playback_session:
+        return jsonify({"error": "item not found"}), 404
+
+    video, item, episode, previous, following, playback = playback_session
+
+    watched, video_start_time = False, 0
+    buffered = playback_buffer.get(key, video_id) # newer than the database
+    if buffered:
+        watched, video_start_time = buffered.get('watched', False), buffered.get('video_paused_at', 0)
+    elif playback:
+        watched, video_start_time = playback.watched, playback.paused_at
+
+    def neighbour(row):
+        return {'id': row.id, 'season_number': row.season_number, 'episode_number': row.episode_number, 'name': row.name} if row else None
+
+    data = {
+        "id": video.id,
+        "media_id": video.media_id,
+        "stream_url": f'/play?v={video.hash_key}',
+        "key_frame": video.keyframe_path,
+        "duration": video.duration,
+        "season_number": video.season_number,
+        "episode_number": video.episode_number,
+        "subtitles": [{
+            "id": s.id,
+            "lang": s.lang,
+            "label": s.label,
+            "src": f'/subs?s={s.hash_key}'
+        } for s in video.subtitles],
+        "resume": {'watched': watched, 'video_start_time': video_start_time or 0},
+        "item": {
+            "id": item.id,
+            "media_type": item.media_type,
+            "title": item.title,
+            "original_title": item.original_title,
+            "release_date": item.release_date
+        } if item else None,
+        "episode": {
+            'air_date': episode.air_date,
+            'episode_type': episode.episode_type,
+            'name': episode.name,
+            'overview': episode.overview,
+            'runtime': episode.runtime,
+            'still_path': episode.still_path,
+            'vote_average': episode.vote_average,
+            'vote_count': episode.vote_count
+        } if episode else None,
+        "previous": neighbour(previous),
+        "next": neighbour(following)
+    }
+    return jsonify(data)
+
+
+@app.route('/content/v1/autocomplete', methods=['GET'])
+@token_required
+def autocomplete():
+    query = request.args.get('query', '')
+    limit = request.args.get('limit', 10, type=int)
+
+    if not query or len(query) > 200:
+        return jsonify({'error': 'invalid query.'}), 400
+
+    if not limit or not (1 <= limit <= 50):
+        return jsonify({'error': 'invalid limit.'}), 400
+
+    return jsonify(results=autocomplete_index.search(query, limit))
+
+
 @app.route('/content/v1/search', methods=['GET'])
 @token_required
+@response_cache.cached()
+@conditional(DB.fetch_library_version)
 def search_results():
     query = request.args.get('query', '')
     
@@ -840,7 +1207,8 @@ def search_results():
     
 
 
-    safer_string = query.replace('%', r'\%').replace('_', r'\_')
+    data = []
+    safer_string = query.strip()
     if safer_string:
         try:
             results = DB.search(safer_string)
@@ -907,20 +1275,21 @@ def get_user_video_playback():
 
 
 
+    buffered = playback_buffer.get(key, video_id) # newer than the database
+    if buffered:
+        return jsonify({'watched': buffered.get('watched', False), 'video_start_time': buffered.get('video_paused_at', 0)})
+
     try:
-        user = DB.fetch_user(key)
-        playback = user.user_playback
+        playback = DB.fetch_user_video_playback(key, video_id)
     except Exception as e:
         logger.error(f'failed to load user.playback, error -> {e}', exc_info=True)
         return jsonify({'error': 'internal error.'}), 400
 
     watched = False
     video_start_time = 0
-    for video in playback:
-        if key == video.user_key and video_id == video.video_id:
-            watched = video.watched
-            video_start_time = video.paused_at
-            break
+    if playback:
+        watched = playback.watched
+        video_start_time = playback.paused_at
 
     return jsonify({'watched': watched, 'video_start_time': video_start_time})
 
@@ -979,7 +1348,7 @@ def post_user_watchtime():
             'video_duration': int(video_duration),
             'watched': watched 
         }
-        DB.set_user_playback(key, data)
+        playback_buffer.add(key, data) # written in batches, see playback_buffer.py
     except Exception as e:
         logger.error(f'exception while trying to update user playback. (user: {key}, data: {data}) error -> {e}')
         return jsonify({'error': 'internal error.'}), 400
@@ -1002,32 +1371,24 @@ def user_library():
         if not id or not isinstance(id, int) or id <= 0:
             return jsonify({'error': 'invalid data.'}), 400  
 
+        library = None
+        playback = []
         try:
-            user = DB.fetch_user(key)
-            try:
-                library = user.user_library
-                playback = user.user_playback
-            except Exception as e:
-                logger.warning(f'failed to load user library, error -> {e}', exc_info=True)
-                library = []
-                playback = []
+            library, playback = DB.fetch_user_media_state(key, id)
         except Exception as e:
-            logger.warning(f'failed to load user, error -> {e}', exc_info=True)
+            logger.warning(f'failed to load user library, error -> {e}', exc_info=True)
 
         
         rated = 0
         watchlisted = 0
 
         if library:
-            for item in library:
-                if item.media_id == id:
-                    rated, watchlisted = item.rated, item.watchlisted
+            rated, watchlisted = library.rated, library.watchlisted
 
         videos = []
-        if playback:
-            for video in playback:
-                if video.media_id == id:
-                    videos.append({'video_id': video.video_id, 'watched': video.watched, 'paused_at': video.paused_at})
+        for video in playback:
+            videos.append({'video_id': video.video_id, 'watched': video.watched, 'paused_at': video.paused_at})
+        playback_buffer.overlay(key, videos, media_id=id)
 
         data = {
             'rated': rated,
@@ -1068,40 +1429,156 @@ def user_library_all():
 
 
 
-    library = []
-    playback = []
+    # delta sync for clients that keep a copy of the user's library (the web pages don't, the home page reads
+    # /accounts/v1/feed and the title page /content/v1/item/<id>/page): with ?since=<cursor of the previous response>
+    # only rows changed since then are sent, plus the ids of rows that were removed ('deleted'). 'full' tells the
+    # client to replace its copy.
+    # rows are serialized as they are read from the database, ?format=ndjson sends one line per row.
+    since = request.args.get('since', type=int)
+
+    # the first query runs and its first batch is read before the response starts, so a database error
+    # falls back to the empty document below instead of cutting a streamed 200 short
     try:
-        user = DB.fetch_user(key)
-        try:
-            library = user.user_library
-            playback = user.user_playback
-        except Exception as e:
-            logger.warning(f'failed to load user library, error -> {e}', exc_info=True)
-            library = []
-            playback = []
+        sections = DB.iter_user_library_changes(key, since)
+        _, full = next(sections)
+        _, rows = next(sections)
+        first = next(rows, None)
+        library_rows = chain([first], rows) if first is not None else ()
     except Exception as e:
-        logger.warning(f'failed to load user, error -> {e}', exc_info=True)
+        logger.warning(f'failed to load user library, error -> {e}', exc_info=True)
+        sections, full, library_rows = iter([('videos', ()), ('tombstones', ())]), True, ()
 
-    lib = []
-    if library:
-        for item in library:
+    # rows are matched with entry_updated >= since, so rows written later in the same second are not missed
+    cursor = since or 0
+    deleted = {'library': [], 'videos': []}
+
+    def library(rows):
+        nonlocal cursor
+        for item in rows:
+            cursor = max(cursor, item.entry_updated or 0)
             if not item.watchlisted:
+                if not full:
+                    deleted['library'].append(item.media_id)
                 continue
-            id, rated, watchlisted, updated = item.media_id, item.rated, item.watchlisted, item.entry_updated
-            media = { 
-                'media_id': id,
-                'rated': rated,
-                'watchlisted': watchlisted,
-                'entry_updated': updated
+            yield {
+                'media_id': item.media_id,
+                'rated': item.rated,
+                'watchlisted': item.watchlisted,
+                'entry_updated': item.entry_updated
             }
-            lib.append(media)
 
-    videos = []
-    if playback:
-        for video in playback:
-            videos.append({'media_id': video.media_id, 'video_id': video.video_id, 'watched': video.watched, 'paused_at': video.paused_at, 'duration': video.video_duration, 'entry_updated': video.entry_updated})
+    def videos(rows):
+        nonlocal cursor
+        buffered = playback_buffer.pending(key) # newer than the database
+        for video in rows:
+            data = {'media_id': video.media_id, 'video_id': video.video_id, 'watched': video.watched, 'paused_at': video.paused_at, 'duration': video.video_duration, 'entry_updated': video.entry_updated}
+            data.update(buffered.pop(video.video_id, {}))
+            cursor = max(cursor, data['entry_updated'] or 0)
+            yield data
+        for data in buffered.values():
+            cursor = max(cursor, data['entry_updated'] or 0)
+            yield data
+
+    def fields():
+        nonlocal cursor
+        yield 'library', Rows(library(library_rows))
+        for name, rows in sections: # each section is pulled after the previous one was streamed
+            if name == 'videos':
+                yield 'videos', Rows(videos(rows))
+            else:
+                for tombstone in rows:
+                    deleted['library' if tombstone.kind == 'library' else 'videos'].append(tombstone.item_id)
+                    cursor = max(cursor, tombstone.entry_updated)
+        yield 'deleted', deleted
+        yield 'cursor', min(cursor, int(datetime.now(timezone.utc).timestamp())) # rows stamped ahead of the clock are sent again
+        yield 'full', full
+
+    ndjson = wants_ndjson()
+    return stream_response(document(fields(), ndjson), ndjson)
+
+
+@app.route('/accounts/v1/feed')
+@token_required
+def user_feed():
+    key = session.get('key')
 
-    return jsonify({'library': lib, 'videos': videos})
+    if not key or not isinstance(key, str):
+        return jsonify({'error': 'invalid session key'}), 400
+
+    buffered = playback_buffer.pending(key) # newer than the database, merged into the rows below
+
+    try:
+        continue_watching = DB.fetch_continue_watching(key)
+        watchlist = DB.fetch_watchlist_cards(key)
+        by_media = {row.media_id: row for row in continue_watching}
+        moved = [v['video_id'] for v in buffered.values() if v['media_id'] not in by_media
+                 or (by_media[v['media_id']].video_id != v['video_id'] and v['entry_updated'] >= (by_media[v['media_id']].last_watched or 0))]
+        moved_videos, moved_episodes, moved_items = DB.fetch_videos_by_ids(moved) if moved else ({}, {}, {})
+    except Exception as e:
+        logger.error(f'failed to fetch user feed, exception {e}.', exc_info=True)
+        return jsonify({'error': 'internal error.'}), 400
+
+    videos = [{'id': row.video_id,
+               'media_id': row.media_id,
+               'media_type': row.media_type,
+               'title': row.title,
+               'name': row.name or row.title,
+               'season_number': row.season_number,
+               'episode_number': row.episode_number,
+               'still_path': row.still_path,
+               'key_frame': row.key_frame,
+               'watched': bool(row.watched),
+               'paused_at': row.paused_at or 0,
+               'duration': row.duration,
+               'next_up': bool(row.next_up),
+               'entry_updated': row.last_watched
+               } for row in continue_watching]
+
+    # heartbeats of the row's video update its progress, a newer video of a title (or a new title) replaces the row.
+    # whether a finished video is followed by its next episode is only known once the buffer was written.
+    rows = {video['media_id']: video for video in videos}
+    for video_id, values in sorted(buffered.items(), key=lambda entry: entry[1]['entry_updated']):
+        row = rows.get(values['media_id'])
+        if row and row['id'] == video_id:
+            row.update({'watched': bool(values['watched']), 'paused_at': values['paused_at'] or 0, 'entry_updated': max(row['entry_updated'] or 0, values['entry_updated'])})
+            row['duration'] = values['duration'] or row['duration']
+            continue
+
+        video = moved_videos.get(video_id)
+        item = moved_items.get(values['media_id'])
+        if not video or not item or (row and values['entry_updated'] < (row['entry_updated'] or 0)):
+            continue
+        episode = moved_episodes.get((video.media_id, video.season_number, video.episode_number))
+        rows[values['media_id']] = {'id': video_id,
+                                    'media_id': values['media_id'],
+                                    'media_type': item.media_type,
+                                    'title': item.title,
+                                    'name': (episode.name if episode else None) or item.title,
+                                    'season_number': video.season_number,
+                                    'episode_number': video.episode_number,
+                                    'still_path': episode.still_path if episode else None,
+                                    'key_frame': video.keyframe_path,
+                                    'watched': bool(values['watched']),
+                                    'paused_at': values['paused_at'] or 0,
+                                    'duration': values['duration'] or video.duration,
+                                    'next_up': False,
+                                    'entry_updated': values['entry_updated']
+                                    }
+    if buffered:
+        videos = sorted(rows.values(), key=lambda video: video['entry_updated'] or 0, reverse=True)[:CONTINUE_WATCHING_LIMIT]
+
+    library = [{'id': item.id,
+                'media_type': item.media_type,
+                'tmdb': item.tmdb_id,
+                'title': item.title,
+                'original_title': item.original_title,
+                'release_date': item.release_date,
+                'poster_path': item.poster_path,
+                'entry_updated': item.entry_updated,
+                'newest_video': item.new_video_inserted
+                } for item in watchlist]
+
+    return jsonify({'continue': videos, 'library': library})
 
 
 @app.route('/content/v1/d', methods=['POST'])
@@ -1187,6 +1664,26 @@ def post_request_data():
     return jsonify({'job_id': job_id, 'status': 'started'}), 202
 
 
+@app.route('/content/v1/cache')
+@token_required
+@admin_required
+def get_response_cache_stats():
+    return jsonify(response_cache.stats())
+
+
+@app.route('/content/v1/duplicates')
+@token_required
+@admin_required
+def get_duplicate_videos():
+    try:
+        duplicates = DB.fetch_duplicate_videos()
+    except Exception as e:
+        logger.error(f'failed to fetch duplicate videos, exception {e}.', exc_info=True)
+        return jsonify({'error': 'internal error.'}), 400
+
+    return jsonify({'wasted_bytes': sum(d['wasted_bytes'] for d in duplicates), 'duplicates': duplicates})
+
+
 
 
 # API SERVE VIDEO Endpoints
@@ -1219,7 +1716,11 @@ def serve_video():
         return jsonify({'error': 'internal error.'}), 400
     
 
-    return send_from_directory(directory, filename)
+    stream_key = f'{request.remote_addr}:{v}'
+    response = send_from_directory(directory, filename)
+    governor.note_stream(stream_key) # lets background jobs back off while streams are busy
+    response.response = governor.timed_reads(stream_key, response.response) # the file is read while the body is sent
+    return response
 
 
 @app.route('/subs')
@@ -1249,6 +1750,22 @@ def serve_subtitles():
 
 
     return send_from_directory(directory, filename)
+
+
+@app.route('/static/<path:filename>', endpoint='static')
+def send_static(filename):
+    # flask's static view, plus the .br / .gz files written by precompress_static() when the client accepts them
+    variant = static_variant(STATIC_FOLDER, filename, request.accept_encodings)
+    if variant:
+        name, encoding = variant
+        response = send_from_directory(STATIC_FOLDER, name, mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(STATIC_FOLDER, filename)
+
+    if os.path.splitext(filename)[1].lower() in STATIC_EXTENSIONS:
+        response.vary.add('Accept-Encoding')
+    return response
     
 
 
@@ -1278,6 +1795,9 @@ def serve_subtitles():
 if __name__ == "__main__":
     create_localdb()
     create_settings()
+    precompress_static(STATIC_FOLDER)
+    load_autocomplete_index()
+    load_browse_index()
 
     sync_thread = threading.Thread(target=sync_libraries)
     sync_thread.start()
@@ -0,0 +1,98 @@
+"""
+Catalog list benchmark: DB.fetch_catalog() (full MediaItem objects) vs DB.fetch_catalog_cards()
+(card columns only), including the dict mapping done by the /content/v1/catalog endpoints.
+
+    python benchmarks/catalog_cards.py
+    python benchmarks/catalog_cards.py --titles 50000 --limits 20 50 1000 50000
+
+Runs against a throwaway database in a temp folder.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def seed(titles: int):
+    from database_utils import Session, MediaItem, chunked
+    from sqlalchemy import insert
+
+    rng = random.Random(0)
+    overview = 'A long overview, like the ones TMDB returns for most titles. ' * 8
+    rows = [{
+        'id': i + 1,
+        'media_type': rng.choice(('tv', 'movie')),
+        'tmdb_id': rng.randint(1, 10 ** 6),
+        'title': f'Title {i}',
+        'original_title': f'Original Title {i}',
+        'release_date': rng.randint(1950, 2025),
+        'tagline': 'A tagline.',
+        'overview': overview,
+        'backdrop_path': f'/backdrop_{i}.jpg',
+        'poster_path': f'/poster_{i}.jpg',
+        'homepage': f'https://example.com/{i}',
+        'popularity': rng.random() * 100,
+        'vote_average': rng.random() * 10,
+        'vote_count': rng.randint(0, 10000),
+        'status': 'Released',
+        'hash_key': f'bench-{i}',
+        'entry_created': 1700000000 + i,
+        'entry_updated': 1700000000 + i,
+        'new_video_inserted': 1700000000 + rng.randint(0, 10 ** 6),
+    } for i in range(titles)]
+
+    with Session() as session:
+        for chunk in chunked(rows, 5000):
+            session.execute(insert(MediaItem), chunk)
+        session.commit()
+
+
+def card(item):
+    # the mapping done by get_catalog() / get_catalog_tv() / get_catalog_movies()
+    return {'id': item.id,
+            'media_type': item.media_type,
+            'tmdb': item.tmdb_id,
+            'title': item.title,
+            'original_title': item.original_title,
+            'release_date': item.release_date,
+            'poster_path': item.poster_path,
+            'entry_updated': item.entry_updated,
+            'newest_video': item.new_video_inserted}
+
+
+def timed(fetch, limit: int, repeat: int):
+    fetch(order_by='new_video_inserted', limit=limit) # warm up
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        [card(item) for item in fetch(order_by='new_video_inserted', limit=limit)]
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--titles', type=int, default=50000, help='titles in the library')
+    parser.add_argument('--limits', type=int, nargs='+', default=[20, 50, 1000, 50000], help='page sizes to fetch')
+    parser.add_argument('--repeat', type=int, default=50, help='runs per measurement (median is reported)')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='lms-bench-'))
+    from database_utils import DB, create_localdb
+    create_localdb()
+    seed(args.titles)
+    print(f'titles={args.titles} repeat={args.repeat} (median, including the dict mapping)')
+
+    for limit in args.limits:
+        orm = timed(DB.fetch_catalog, limit, args.repeat)
+        cards = timed(DB.fetch_catalog_cards, limit, args.repeat)
+        print(f'  limit={limit:<6} ORM {orm * 1000:8.2f} ms   cards {cards * 1000:8.2f} ms   {orm / cards:4.1f}x')
+
+
+if __name__ == '__main__':
+    main()
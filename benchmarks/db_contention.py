@@ -0,0 +1,116 @@
+"""
+Database contention benchmark: a library sync writing titles, videos and subtitles
+while API readers query the catalog, items and videos on 8 threads (like waitress).
+
+    python benchmarks/db_contention.py
+    python benchmarks/db_contention.py --journal DELETE   # old rollback journal, for comparison
+
+Runs against a throwaway database in a temp folder.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def percentile(values: list[float], p: float):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--titles', type=int, default=100, help='titles inserted by the sync')
+    parser.add_argument('--videos', type=int, default=10, help='videos per title')
+    parser.add_argument('--readers', type=int, default=8, help='concurrent API reader threads')
+    parser.add_argument('--journal', default='WAL', help='journal_mode to benchmark (WAL, DELETE)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lms-bench-')
+    os.chdir(workdir)
+
+    import database_utils
+    from database_utils import DB, create_localdb, insert_new, insert_video_file, insert_subtitles
+
+    database_utils.SQLITE_PRAGMAS['journal_mode'] = args.journal
+    if args.journal.upper() != 'WAL':
+        database_utils.SQLITE_PRAGMAS['synchronous'] = 'FULL'
+    create_localdb()
+
+    # a few titles so readers have something to read from the start
+    seed_ids = [insert_new({'title': f'Seed {i}', 'release_date': 2000, 'media_type': 'tv', 'hash_key': f'seed-{i}'}) for i in range(20)]
+
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def reader(n: int):
+        i = 0
+        while not stop.is_set():
+            i += 1
+            item_id = seed_ids[(n + i) % len(seed_ids)]
+            start = time.perf_counter()
+            try:
+                DB.fetch_catalog(order_by='new_video_inserted', limit=50)
+                DB.fetch_id(item_id)
+                DB.fetch_videos(item_id)
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    def sync():
+        for t in range(args.titles):
+            item_id = insert_new({'title': f'Title {t}', 'release_date': 2000, 'media_type': 'tv', 'hash_key': f'title-{t}'})
+            for v in range(args.videos):
+                video_id = insert_video_file(item_id, {
+                    'season_number': 1,
+                    'episode_number': v + 1,
+                    'file_path': f'/library/title-{t}/episode-{v}.mp4',
+                    'hash_key': f'video-{t}-{v}',
+                    'size': 1024,
+                    'duration': 1200
+                })
+                insert_subtitles(video_id, [{'path': f'/library/title-{t}/episode-{v}/{s}_en.vtt', 'hash_key': f'sub-{t}-{v}-{s}', 'lang': 'en', 'label': 'English'} for s in range(2)])
+
+    readers = [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    for thread in readers:
+        thread.start()
+
+    start = time.perf_counter()
+    sync_errors = []
+    try:
+        sync()
+    except Exception as e:
+        sync_errors.append(repr(e))
+    sync_time = time.perf_counter() - start
+
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    writes = args.titles * (args.videos + 1)
+    print(f'journal_mode={args.journal} titles={args.titles} videos/title={args.videos} readers={args.readers}')
+    print(f'sync: {sync_time:.2f}s ({writes / sync_time:.0f} write transactions/s) errors={len(sync_errors)}')
+    print(f'reads: {len(latencies)} requests ({len(latencies) / sync_time:.0f}/s) errors={len(errors)}')
+    if latencies:
+        print(f'read latency ms: p50={statistics.median(latencies) * 1000:.1f} '
+              f'p95={percentile(latencies, 0.95) * 1000:.1f} '
+              f'p99={percentile(latencies, 0.99) * 1000:.1f} '
+              f'max={max(latencies) * 1000:.1f}')
+    for error in (sync_errors + errors)[:5]:
+        print(f'  {error}')
+
+
+if __name__ == '__main__':
+    main()
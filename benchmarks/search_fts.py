@@ -0,0 +1,111 @@
+"""
+Search benchmark: the FTS5 index behind DB.search() vs the old title LIKE '%q%' scan.
+
+    python benchmarks/search_fts.py
+    python benchmarks/search_fts.py --sizes 10000 100000 --queries 200
+
+Runs against a throwaway database in a temp folder, for each library size.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SYLLABLES = ('ka', 'ri', 'mo', 'ten', 'sha', 'lo', 'ver', 'dan', 'ei', 'mar', 'us', 'qui', 'bel', 'tor', 'na', 'gri')
+GENRES = ('Drama', 'Comedy', 'Crime', 'Action', 'Horror', 'Documentary', 'Animation', 'Romance')
+
+
+def percentile(values: list[float], p: float):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def vocabulary(rng: random.Random, size: int = 5000):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(size: int, words: list[str], rng: random.Random):
+    from database_utils import Session, MediaItem, Genre, media_genres, refresh_search_index, chunked
+    from sqlalchemy import insert
+
+    with Session() as session:
+        session.execute(insert(Genre), [{'id': i + 1, 'name': name} for i, name in enumerate(GENRES)])
+        rows = [{
+            'id': i + 1,
+            'title': ' '.join(rng.choice(words) for _ in range(rng.randint(1, 4))).title() + f' {i}',
+            'overview': ' '.join(rng.choice(words) for _ in range(30)),
+            'media_type': rng.choice(('tv', 'movie')),
+            'hash_key': f'bench-{i}',
+            'release_date': rng.randint(1950, 2025),
+        } for i in range(size)]
+        for chunk in chunked(rows, 5000):
+            session.execute(insert(MediaItem), chunk)
+        session.execute(insert(media_genres), [{'media_id': i + 1, 'genre_id': rng.randint(1, len(GENRES))} for i in range(size)])
+        refresh_search_index(session)
+        session.commit()
+
+
+def like_search(input_str: str):
+    # DB.search() before the FTS index
+    from database_utils import ReadSession, MediaItem
+    from sqlalchemy.orm import joinedload
+
+    with ReadSession() as session:
+        return (
+            session.query(MediaItem)
+            .options(joinedload(MediaItem.genres))
+            .filter(MediaItem.title.ilike(f"%{input_str}%"))
+            .all()
+        )
+
+
+def timed(search, queries: list[str]):
+    latencies = []
+    results = 0
+    for query in queries:
+        start = time.perf_counter()
+        results += len(search(query))
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='library sizes (titles)')
+    parser.add_argument('--queries', type=int, default=100, help='searches per method and size')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = vocabulary(rng)
+    # what the debounced search box sends while typing: prefixes of 3+ characters
+    queries = [rng.choice(words)[:rng.randint(3, 8)] for _ in range(args.queries)]
+
+    import importlib
+    for size in args.sizes:
+        os.chdir(tempfile.mkdtemp(prefix='lms-bench-'))
+        import database_utils
+        database_utils = importlib.reload(database_utils) # fresh engines for the new folder
+        database_utils.create_localdb()
+
+        start = time.perf_counter()
+        seed(size, words, rng)
+        print(f'titles={size} (seeded in {time.perf_counter() - start:.1f}s) queries={len(queries)}')
+
+        for name, search in (('LIKE scan', like_search), ('FTS5 bm25', database_utils.DB.search)):
+            timed(search, queries[:5]) # warm up the page cache
+            latencies, results = timed(search, queries)
+            print(f'  {name:10} p50={statistics.median(latencies) * 1000:7.2f} ms '
+                  f'p95={percentile(latencies, 0.95) * 1000:7.2f} ms '
+                  f'max={max(latencies) * 1000:7.2f} ms results/query={results / len(queries):.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Memory benchmark of the large list responses: building the whole document and jsonify()-ing it
+vs streaming it from a database cursor (json_stream), for /accounts/v1/l/a and /content/v1/item/<id>/seasons.
+Reports the peak Python memory (tracemalloc) and time of one request, body read to the end.
+
+    python benchmarks/streaming_json.py
+    python benchmarks/streaming_json.py --rows 200000 --seasons 40 --episodes 1000
+
+Runs against a throwaway database in a temp folder.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+USER_KEY = 'bench-user'
+MEDIA_ID = 1
+
+
+def seed(rows: int, seasons: int, episodes: int):
+    from database_utils import Session, MediaItem, TvDetails, TvSeason, TvEpisode, UserLibrary, UserPlayback, chunked
+    from sqlalchemy import insert
+
+    overview = 'An episode overview, about as long as the ones TMDB returns for most episodes. ' * 4
+    with Session() as session:
+        session.execute(insert(MediaItem), [{'id': MEDIA_ID, 'media_type': 'tv', 'title': 'Bench', 'hash_key': 'bench'}])
+        session.execute(insert(TvDetails), [{'id': 1, 'media_id': MEDIA_ID}])
+        session.execute(insert(TvSeason), [{'id': s + 1, 'media_id': MEDIA_ID, 'tv_id': 1, 'season_number': s + 1, 'name': f'Season {s + 1}', 'overview': overview, 'episode_count': episodes} for s in range(seasons)])
+        episode_rows = [{
+            'media_id': MEDIA_ID,
+            'season_id': s + 1,
+            'season_number': s + 1,
+            'episode_number': e + 1,
+            'name': f'Episode {e + 1}',
+            'overview': overview,
+            'air_date': '2020-01-01',
+            'still_path': f'/still_{s}_{e}.jpg',
+            'runtime': 45,
+        } for s in range(seasons) for e in range(episodes)]
+        for chunk in chunked(episode_rows, 5000):
+            session.execute(insert(TvEpisode), chunk)
+
+        for chunk in chunked(list(range(rows)), 5000):
+            session.execute(insert(UserLibrary), [{'user_key': USER_KEY, 'media_id': i + 1, 'watchlisted': True, 'entry_updated': 1700000000 + i} for i in chunk])
+            session.execute(insert(UserPlayback), [{'user_key': USER_KEY, 'media_id': i + 1, 'video_id': i + 1, 'paused_at': i, 'video_duration': 3600, 'entry_updated': 1700000000 + i} for i in chunk])
+        session.commit()
+
+
+def buffered_library():
+    # the previous /accounts/v1/l/a: every row loaded, mapped to a list of dicts, then jsonify()
+    from flask import jsonify
+    from database_utils import DB
+    changes = DB.fetch_user_library_changes(USER_KEY, None)
+    library = [{'media_id': i.media_id, 'rated': i.rated, 'watchlisted': i.watchlisted, 'entry_updated': i.entry_updated} for i in changes['library'] if i.watchlisted]
+    videos = [{'media_id': v.media_id, 'video_id': v.video_id, 'watched': v.watched, 'paused_at': v.paused_at, 'duration': v.video_duration, 'entry_updated': v.entry_updated} for v in changes['videos']]
+    cursor = max([0] + [i.entry_updated or 0 for i in changes['library']] + [v['entry_updated'] or 0 for v in videos])
+    return jsonify({'library': library, 'videos': videos, 'deleted': {'library': [], 'videos': []}, 'cursor': cursor, 'full': True})
+
+
+def buffered_seasons():
+    # the previous /content/v1/item/<id>/seasons: all seasons with joined episodes, then jsonify()
+    from flask import jsonify
+    from database_utils import DB
+    fields = ('id', 'media_id', 'season_id', 'season_number', 'episode_number', 'name', 'episode_type', 'overview', 'air_date', 'still_path', 'runtime', 'vote_average', 'vote_count')
+    return jsonify([{
+        'season_number': s.season_number,
+        'name': s.name,
+        'overview': s.overview,
+        'poster_path': s.poster_path,
+        'episode_count': s.episode_count,
+        'episodes': [{f: getattr(e, f) for f in fields} for e in s.episodes]
+    } for s in DB.fetch_season(MEDIA_ID)])
+
+
+def measure(request):
+    # timed without tracemalloc, which slows allocations down a lot
+    start = time.perf_counter()
+    size = request()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    request()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000, help='library and playback rows of the user')
+    parser.add_argument('--seasons', type=int, default=20, help='seasons of the benchmarked show')
+    parser.add_argument('--episodes', type=int, default=500, help='episodes per season')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='lms-bench-'))
+    os.environ.setdefault('FLASK_KEY', 'bench')
+    from database_utils import create_localdb
+    create_localdb()
+    seed(args.rows, args.seasons, args.episodes)
+
+    import jwt
+    from app import app
+    token = jwt.encode({'exp': int(time.time()) + 3600}, app.secret_key, algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['auth'] = True
+        s['key'] = USER_KEY
+
+    def streamed(path):
+        def request():
+            response = client.get(path, headers=headers, buffered=False)
+            size = sum(len(chunk) for chunk in response.response) # read the body as a client would
+            response.close()
+            return size
+        return request
+
+    def buffered(build, path):
+        def request():
+            with app.test_request_context(path):
+                return len(build().get_data())
+        return request
+
+    print(f'rows={args.rows} seasons={args.seasons}x{args.episodes} (peak traced memory and time of one request)')
+    cases = [
+        ('/accounts/v1/l/a', buffered_library, '/accounts/v1/l/a'),
+        ('/content/v1/item/<id>/seasons', buffered_seasons, f'/content/v1/item/{MEDIA_ID}/seasons'),
+    ]
+    for name, build, path in cases:
+        buffered(build, path)() # warm up
+        streamed(path)()
+        b_peak, b_time, b_size = measure(buffered(build, path))
+        s_peak, s_time, s_size = measure(streamed(path))
+        print(f'  {name:<32} jsonify {b_peak / 2 ** 20:8.1f} MiB {b_time * 1000:8.1f} ms   '
+              f'stream {s_peak / 2 ** 20:8.1f} MiB {s_time * 1000:8.1f} ms   body {b_size / 2 ** 20:.1f} / {s_size / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import re
+import json
+import hashlib
+import threading
+import unicodedata
+from compression import compress
+import logging
+logger = logging.getLogger(__name__)
+
+
+
+LEADING_ARTICLES = ('the', 'a', 'an') # skipped when sorting and bucketing, 'The Expanse' is listed under E
+OTHER_BUCKET = '#' # titles starting with a digit or symbol
+
+
+
+def sort_key(title: str) -> str:
+    """
+    'The Amélie Show' -> 'amelie show', '"Weird Al" Yankovic' -> 'weird al" yankovic', 'A' -> 'a'
+    Accents are folded, case is ignored, leading punctuation and articles are skipped.
+    """
+    text = unicodedata.normalize('NFKD', title or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold().strip()
+    text = re.sub(r'^[\W_]+', '', text)
+    stripped = re.sub(rf'^(?:{"|".join(LEADING_ARTICLES)})\s+[\W_]*', '', text)
+    return stripped or text # a title that is only an article keeps it
+
+
+def bucket(key: str) -> str:
+    """
+    Letter a sort_key() is listed under: its first letter in upper case (any script), else OTHER_BUCKET.
+    """
+    return key[0].upper() if key and key[0].isalpha() else OTHER_BUCKET
+
+
+
+class BrowseIndex():
+    """
+    Pre-serialized alphabetical index of the library served by /content/v1/index:
+    { letter: [{'id', 'title', 'category'}, ...] } with letters and titles in sort_key() order.
+
+    Every letter's JSON is kept as bytes and only the letters touched by an update are sorted and
+    serialized again, so a request costs a lookup of the finished body (and its compressed variants).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {} # { media id: (letter, sort key, entry) }
+        self._letters = {} # { letter: {media id: (sort key, entry)} }
+        self._fragments = {} # { letter: b'"A": [...]' }
+        self._body = b'{}'
+        self._etag = None
+        self._encoded = {} # { encoding: compressed body }
+        self.ready = False
+
+
+    def __len__(self):
+        return len(self._items)
+
+
+    def build(self, entries: dict[int, dict]):
+        """
+        Replace the index. `entries` is { media id: {'title', 'category'} }.
+        """
+        with self._lock:
+            self._items, self._letters, self._fragments = {}, {}, {}
+            letters = self._add(entries)
+            self._refresh(letters)
+            self.ready = True
+        logger.info(f'browse index built: {len(self._items)} item(s), {len(self._letters)} letter(s)')
+
+
+    def update(self, entries: dict[int, dict]):
+        """
+        Add or replace (renamed, recategorized) items.
+        """
+        with self._lock:
+            letters = self._remove(entries.keys()) | self._add(entries)
+            self._refresh(letters)
+
+
+    def remove(self, media_ids: list[int]):
+        with self._lock:
+            self._refresh(self._remove(media_ids))
+
+
+    def body(self, encoding: str = None) -> tuple[bytes, str]:
+        """
+        (JSON body, ETag of the uncompressed body) of the index, compressed with `encoding`
+        ('br' / 'gzip', see compression.negotiate()) on the first request after each change.
+        """
+        with self._lock:
+            if not encoding:
+                return self._body, self._etag
+            if encoding not in self._encoded:
+                self._encoded[encoding] = compress(self._body, encoding)
+            return self._encoded[encoding], self._etag
+
+
+    def _add(self, entries: dict[int, dict]) -> set[str]:
+        letters = set()
+        for media_id, entry in entries.items():
+            key = sort_key(entry['title'])
+            letter = bucket(key)
+            data = {'id': media_id, 'title': entry['title'], 'category': entry['category']}
+            self._items[media_id] = (letter, key, data)
+            self._letters.setdefault(letter, {})[media_id] = (key, data)
+            letters.add(letter)
+        return letters
+
+
+    def _remove(self, media_ids) -> set[str]:
+        letters = set()
+        for media_id in media_ids:
+            item = self._items.pop(media_id, None)
+            if item:
+                letter = item[0]
+                del self._letters[letter][media_id]
+                letters.add(letter)
+        return letters
+
+
+    def _refresh(self, letters: set[str]):
+        # serialize the changed letters again and join all of them into the body
+        for letter in letters:
+            items = self._letters.get(letter)
+            if not items:
+                self._letters.pop(letter, None)
+                self._fragments.pop(letter, None)
+                continue
+            ordered = sorted(items.values(), key=lambda item: (item[0], item[1]['title'] or '', item[1]['id']))
+            self._fragments[letter] = f'{json.dumps(letter)}: {json.dumps([data for _, data in ordered])}'.encode()
+
+        order = sorted(self._fragments, key=lambda letter: (letter != OTHER_BUCKET, letter))
+        self._body = b'{' + b', '.join(self._fragments[letter] for letter in order) + b'}'
+        self._etag = hashlib.sha1(self._body).hexdigest()[:20]
+        self._encoded = {}
+
+
+
+browse_index = BrowseIndex()
@@ -0,0 +1,149 @@
+import os
+import gzip
+import zlib
+from werkzeug.security import safe_join
+import logging
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+
+
+COMPRESS_MIN_BYTES = 1024 # smaller responses are sent as they are
+COMPRESS_MIMETYPES = {'application/json', 'application/x-ndjson'}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5 # per response, fast. precompressed static files use the maximum
+STATIC_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.html', '.txt', '.map', '.ico'}
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz')) # preferred first
+
+
+
+def negotiate(accept_encodings) -> str | None:
+    """
+    'br', 'gzip' or None for a request's Accept-Encoding (werkzeug request.accept_encodings).
+    """
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compress an iterable of byte chunks as they come, for streamed responses. Output is yielded
+    whenever the compressor emits a block, so memory stays bounded without flushing every small chunk.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # 31 = gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def compress_response(response, accept_encodings):
+    """
+    Compress an API response (COMPRESS_MIMETYPES) for the client, buffered bodies of at least
+    COMPRESS_MIN_BYTES in one go, streamed ones chunk by chunk. Strong ETags get the encoding appended,
+    see response_cache.etag_matches().
+    """
+    if response.mimetype not in COMPRESS_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if response.status_code != 200 or 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+    if not response.is_streamed and response.content_length is not None and response.content_length < COMPRESS_MIN_BYTES:
+        return response
+
+    encoding = negotiate(accept_encodings)
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        chunks = (chunk.encode() if isinstance(chunk, str) else chunk for chunk in response.response)
+        response.response = compress_stream(chunks, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
+
+
+def precompress_static(folder: str) -> int:
+    """
+    Build step: write .gz (and .br, with brotli installed) files next to the text assets in `folder`,
+    served instead of the originals by static_variant(). Up to date variants are skipped.
+    Returns the number of files written.
+    """
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in STATIC_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            data = None
+            for encoding, suffix in STATIC_ENCODINGS:
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                compressed = brotli.compress(data, quality=11) if encoding == 'br' else gzip.compress(data, compresslevel=9, mtime=0)
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+
+    logger.info(f'precompressed static assets: {written} file(s) written')
+    return written
+
+
+def static_variant(folder: str, filename: str, accept_encodings) -> tuple[str, str] | None:
+    """
+    (precompressed file name, encoding) to serve for `filename`, or None to serve the original.
+    """
+    if os.path.splitext(filename)[1].lower() not in STATIC_EXTENSIONS:
+        return None
+
+    source = safe_join(folder, filename)
+    if source is None:
+        return None
+    for encoding, suffix in STATIC_ENCODINGS:
+        if not accept_encodings[encoding]:
+            continue
+        variant = source + suffix
+        if os.path.isfile(variant) and os.path.isfile(source) and os.path.getmtime(variant) >= os.path.getmtime(source):
+            return filename + suffix, encoding
+    return None
+
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    precompress_static(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
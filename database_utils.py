@@ -1,6 +1,8 @@
 from __future__ import annotations
-from sqlalchemy import create_engine, MetaData, DateTime, Table, Column, Integer, String, Float, Boolean, ForeignKey, UniqueConstraint, desc, asc, or_
-from sqlalchemy.orm import scoped_session, Mapped, mapped_column, sessionmaker, declarative_base, relationship, joinedload
+from sqlalchemy import create_engine, event, insert, update, delete, select, tuple_, text, bindparam, literal, case, exists, MetaData, DateTime, Table, Column, Integer, String, Float, Boolean, ForeignKey, UniqueConstraint, Index, desc, asc, or_, and_, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import scoped_session, Mapped, mapped_column, sessionmaker, declarative_base, relationship, joinedload, selectinload, make_transient_to_detached, aliased
 from sqlalchemy.inspection import inspect
 from datetime import datetime, timezone
 from random import randint
@@ -9,29 +11,147 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import re
 import secrets
 import json
+import time
+import threading
 import logging
+from contextvars import ContextVar
+from collections import OrderedDict
 logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger(f'{__name__}.slow_queries')
 
 # GLOBAL VARIABLE
 last_updated_flag = False
-
-
+search_fts = True # False if the sqlite build has no FTS5, see create_search_index()
+library_listeners = [] # callbacks(media_ids, deleted), see on_library_change()
+
+
+DATABASE_URL = 'sqlite:///localdb.db'
+
+# Applied to every new connection. WAL lets API readers keep reading while a sync commits,
+# busy_timeout makes a connection wait for a lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',        # safe with WAL, fsync only on checkpoints
+    'busy_timeout': 15000,          # ms
+    'cache_size': -65536,           # negative = KiB, 64 MB page cache per connection
+    'mmap_size': 268435456,         # 256 MB memory mapped reads
+    'temp_store': 'MEMORY',
+}
+READ_POOL_SIZE = 8 # matches waitress threads
+BULK_CHUNK_SIZE = 500 # rows per transaction for the *_bulk() ingest functions
+STREAM_BATCH_SIZE = 500 # rows fetched at a time by the iter_*() generators streaming API responses
+# columns of a catalog card, see DB.fetch_catalog_cards()
+CARD_COLUMNS = ('id', 'media_type', 'tmdb_id', 'title', 'original_title', 'release_date', 'poster_path', 'entry_updated', 'new_video_inserted')
+SEARCH_LIMIT = 200 # max results of DB.search()
+CONTINUE_WATCHING_LIMIT = 5 # titles in the home page's continue watching row
+# indexes replaced by others, dropped from existing databases by upgrade_localdb()
+DROPPED_INDEXES = ('ix_media_items_new_video', 'ix_media_items_type_new_video')
+# bm25 weights of the media_search columns: title, original_title, overview, genres, cast
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0, 2.0, 2.0)
+DIMENSION_CACHE_SIZE = 100000 # genres, ratings, companies, networks, characters and actors kept as {key: id}
+TOMBSTONE_RETENTION_DAYS = 90 # older delta sync cursors get a full sync instead
+SLOW_QUERY_MS = 100 # statements slower than this are written to the slow query log with their query plan
+
+
+def apply_sqlite_pragmas(dbapi_connection, query_only=False):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {pragma}={value}')
+    if query_only:
+        cursor.execute('PRAGMA query_only=ON')
+    cursor.close()
+
+
+# Writer: a single pooled connection, so writes from the sync / TMDB threads and API endpoints
+# queue up in the pool instead of competing for SQLite's write lock.
 db = create_engine(
-    'sqlite:///localdb.db',
+    DATABASE_URL,
     connect_args={"check_same_thread": False},
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=300,
     future=True
 )
+# Reader: a pool of read-only connections used by the DB.fetch_* methods.
+read_db = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=READ_POOL_SIZE,
+    max_overflow=READ_POOL_SIZE,
+    future=True
+)
+event.listen(db, 'connect', lambda dbapi_connection, _: apply_sqlite_pragmas(dbapi_connection))
+event.listen(read_db, 'connect', lambda dbapi_connection, _: apply_sqlite_pragmas(dbapi_connection, query_only=True))
+
+
+# Per request SQL statistics, see start_query_stats()
+query_stats: ContextVar[dict] = ContextVar('query_stats', default=None)
+
+
+def start_query_stats() -> dict:
+    """
+    Count statements and database time from here on in the current context (a Flask request).
+    Returns the dict that is filled in: {'count': statements, 'time': seconds}.
+    """
+    stats = {'count': 0, 'time': 0.0}
+    query_stats.set(stats)
+    return stats
+
+
+def stop_query_stats():
+    query_stats.set(None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+
+    stats = query_stats.get()
+    if stats is not None:
+        stats['count'] += 1
+        stats['time'] += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        log_slow_query(cursor, statement, parameters, executemany, elapsed)
+
+
+def log_slow_query(cursor, statement: str, parameters, executemany: bool, elapsed: float):
+    plan = ''
+    if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+        try:
+            explain = cursor.connection.cursor()
+            rows = explain.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            explain.close()
+            plan = '\n'.join(f'  {row[-1]}' for row in rows)
+        except Exception as e:
+            plan = f'  (no query plan: {e})'
+
+    slow_query_logger.warning(f'slow query ({elapsed * 1000:.1f} ms): {statement}\nparameters: {str(parameters)[:500]}\n{plan}')
+
+
+for engine in (db, read_db):
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
 session_factory = sessionmaker(bind=db)
 Session = scoped_session(session_factory)
+read_session_factory = sessionmaker(bind=read_db)
+ReadSession = scoped_session(read_session_factory)
 Base = declarative_base()
 
 def create_localdb():
     if os.path.exists('localdb.db'):
+        upgrade_localdb()
         return    
     
     Base.metadata.create_all(db)
+    create_search_index()
     
     with Session() as session:
         # Preload the characters table with a default entry "NO CHARACTER".
@@ -52,6 +172,137 @@ def create_localdb():
     insert_new_user(password, key, is_admin=True, is_adult=True)
 
 
+def upgrade_localdb():
+    """
+    Bring an existing localdb.db up to date with the models.
+
+    create_all() only creates missing tables, so columns and indexes added to
+    existing tables are created here.
+    """
+    Base.metadata.create_all(db)
+
+    with db.begin() as conn:
+        inspector = inspect(conn) # inspect on the same connection, the writer pool only has one
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=db.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+                logger.info(f"database upgrade: added column '{table.name}.{column.name}'")
+
+            existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.unique:
+                    dedupe_rows(conn, table.name, [c.name for c in index.columns])
+                index.create(conn)
+
+        for name in DROPPED_INDEXES:
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+
+    create_search_index()
+
+
+def dedupe_rows(conn, table_name: str, columns: list[str]):
+    """
+    Keep only the most recently updated row of each `columns` group, so a unique index can be created
+    over rows written before it existed. Rows with a NULL in `columns` never conflict and are kept.
+    """
+    group = ', '.join(columns)
+    not_null = ' AND '.join(f'{c} IS NOT NULL' for c in columns)
+    result = conn.exec_driver_sql(f"""
+        DELETE FROM {table_name} WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY entry_updated DESC, id DESC) AS n
+                FROM {table_name} WHERE {not_null}
+            ) WHERE n > 1
+        )""")
+    if result.rowcount:
+        logger.info(f"database upgrade: removed {result.rowcount} duplicate row(s) from '{table_name}' ({group})")
+
+
+def on_library_change(callback):
+    """
+    Register `callback(media_ids: list[int], deleted: bool)`, called after media items (or their videos
+    and subtitles) are inserted, updated or deleted (after the commit). Used to keep in-memory indexes
+    and caches in sync with the database.
+    """
+    library_listeners.append(callback)
+    return callback
+
+
+def notify_library_change(media_ids: list[int], deleted: bool = False):
+    if not media_ids:
+        return
+    for callback in library_listeners:
+        try:
+            callback(list(media_ids), deleted)
+        except Exception as e:
+            logger.error(f'library change listener {callback.__name__} failed, exception {e}.', exc_info=True)
+
+
+def create_search_index():
+    """
+    Create the FTS5 table behind DB.search() (rowid = media_items.id) and fill it if it is new.
+    Without FTS5 support in the sqlite build, DB.search() falls back to a LIKE scan on titles.
+    """
+    global search_fts
+    with db.begin() as conn:
+        exists = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type='table' AND name='media_search'").first()
+        if exists:
+            return
+        try:
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE media_search USING fts5("
+                "title, original_title, overview, genres, cast, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+        except OperationalError:
+            logger.warning('sqlite was built without FTS5, search falls back to title LIKE scans.', exc_info=True)
+            search_fts = False
+            return
+
+    with Session() as session:
+        refresh_search_index(session)
+        session.commit()
+    logger.info('database upgrade: created full-text search index')
+
+
+def refresh_search_index(session, media_ids: list[int] = None):
+    """
+    Rewrite the media_search rows of `media_ids` (all items if None) from media_items, genres and cast.
+    Runs in the caller's session so the index is committed together with the item.
+    """
+    if not search_fts:
+        return
+
+    columns = """
+        SELECT m.id, m.title, m.original_title, m.overview,
+            (SELECT group_concat(g.name, ' ') FROM media_genres mg JOIN genres g ON g.id = mg.genre_id WHERE mg.media_id = m.id),
+            (SELECT group_concat(a.name, ' ') FROM media_cast mc JOIN actors a ON a.id = mc.actor_id WHERE mc.media_id = m.id)
+        FROM media_items m"""
+    insert_sql = f"INSERT INTO media_search (rowid, title, original_title, overview, genres, cast) {columns}"
+
+    if media_ids is None:
+        session.execute(text("DELETE FROM media_search"))
+        session.execute(text(insert_sql))
+        return
+
+    for chunk in chunked(list(media_ids)):
+        params = {'ids': chunk}
+        session.execute(text("DELETE FROM media_search WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True)), params)
+        session.execute(text(f"{insert_sql} WHERE m.id IN :ids").bindparams(bindparam('ids', expanding=True)), params)
+
+
+def search_match_query(input_str: str) -> str:
+    """
+    'break bad' -> '"break"* "bad"*' (every word, as a prefix).
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', input_str))
+
+
 def add_account(password_string: str, is_admin=False, is_adult=True):
     if not password_string or not isinstance(password_string, str):
         print('user account creation failed: password must be a non-empty password_string')
@@ -169,6 +420,15 @@ class MediaItem(Base):
     movie_details: Mapped[MovieDetails] = relationship(back_populates='media_item', cascade='all, delete-orphan')
     tv_details: Mapped[TvDetails] = relationship(back_populates='media_item', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # catalog pages ordered by newest video / title, all items and per media type (DB.fetch_catalog_cards)
+        Index('ix_media_items_new_video_id', 'new_video_inserted', 'id'),
+        Index('ix_media_items_type_new_video_id', 'media_type', 'new_video_inserted', 'id'),
+        Index('ix_media_items_title_id', 'title', 'id'),
+        Index('ix_media_items_type_title_id', 'media_type', 'title', 'id'),
+        Index('ix_media_items_entry_updated', 'entry_updated'), # max() for DB.fetch_library_version()
+    )
+
 
     # # includes relationships
     # def __repr__(self):
@@ -275,6 +535,10 @@ class TvEpisode(Base):
 
     tv_season: Mapped[TvSeason] = relationship(back_populates='episodes')
 
+    __table_args__ = (
+        Index('ix_episode_media_season_episode', 'media_id', 'season_number', 'episode_number'), # single episode lookups by (show, SxxEyy)
+    )
+
     def __repr__(self):
         mapper = inspect(self.__class__)
         attrs = {c.key: getattr(self, c.key) for c in mapper.columns}
@@ -407,6 +671,10 @@ class VideoMetadata(Base):
     file_path: Mapped[str] = mapped_column(nullable=False, unique=True)
     hash_key: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
     keyframe_path: Mapped[str] = mapped_column(nullable=True)
+    # size + sampled hash of the source file (before transcoding), used to detect duplicate files
+    source_size: Mapped[int] = mapped_column(nullable=True)
+    content_hash: Mapped[str] = mapped_column(nullable=True, index=True)
+    transcoded: Mapped[bool] = mapped_column(nullable=True) # the stored file is a transcode of the source, NULL = not known yet
 
     resolution: Mapped[str] = mapped_column(nullable=True)
     extension: Mapped[str] = mapped_column(nullable=True)
@@ -578,6 +846,11 @@ class UserLibrary(Base):
 
     user: Mapped[User] = relationship(back_populates='user_library')
 
+    __table_args__ = (
+        Index('uix_library_user_media', 'user_key', 'media_id', unique=True),
+        Index('ix_library_user_updated', 'user_key', 'entry_updated'), # delta sync, see DB.fetch_user_library_changes()
+    )
+
     def __repr__(self):
         mapper = inspect(self.__class__)
         attrs = {c.key: getattr(self, c.key) for c in mapper.columns}
@@ -604,6 +877,12 @@ class UserPlayback(Base):
 
     user: Mapped[User] = relationship(back_populates='user_playback')
 
+    __table_args__ = (
+        Index('uix_playback_user_video', 'user_key', 'video_id', unique=True),
+        Index('ix_playback_user_media', 'user_key', 'media_id'), # a user's videos of one title
+        Index('ix_playback_user_updated', 'user_key', 'entry_updated'), # delta sync, see DB.fetch_user_library_changes()
+    )
+
     def __repr__(self):
         mapper = inspect(self.__class__)
         attrs = {c.key: getattr(self, c.key) for c in mapper.columns}
@@ -611,6 +890,27 @@ class UserPlayback(Base):
         return f"<{self.__class__.__name__}({attr_str})>"  
 
 
+class UserTombstone(Base):
+    """
+    Marks user_library / user_playback rows that were deleted, so delta syncs can tell clients to drop them.
+    """
+    __tablename__ = 'user_tombstones'
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_key: Mapped[str] = mapped_column(nullable=False)
+    kind: Mapped[str] = mapped_column(nullable=False) # 'library' (item_id = media id) | 'video' (item_id = video id)
+    item_id: Mapped[int] = mapped_column(nullable=True)
+    entry_updated: Mapped[int] = mapped_column(nullable=False)
+
+    __table_args__ = (Index('ix_tombstones_user_updated', 'user_key', 'entry_updated'),)
+
+    def __repr__(self):
+        mapper = inspect(self.__class__)
+        attrs = {c.key: getattr(self, c.key) for c in mapper.columns}
+        attr_str = ', '.join(f"{k}={v!r}" for k, v in attrs.items())
+        return f"<{self.__class__.__name__}({attr_str})>"
+
+
 
 
 
@@ -657,8 +957,103 @@ def upsert_item(item: MediaItem, data: dict):
         item.entry_updated = int(datetime.now(timezone.utc).timestamp())
 
 
+class DimensionCache():
+    """
+    Process-wide LRU of dimension rows (genres, content ratings, companies, networks, characters, actors)
+    stored as {(model, key): id}, so refreshing a title only queries the rows it has not seen yet.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model, key):
+        with self._lock:
+            row_id = self._rows.get((model, key))
+            if row_id is not None:
+                self._rows.move_to_end((model, key))
+            return row_id
+
+    def put(self, model, key, row_id: int):
+        with self._lock:
+            self._rows[(model, key)] = row_id
+            self._rows.move_to_end((model, key))
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+
+    def discard(self, model, key):
+        with self._lock:
+            self._rows.pop((model, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+
+dimension_cache = DimensionCache(DIMENSION_CACHE_SIZE)
+
+
+def fetch_dimensions(session, model, key_columns: tuple[str, ...], keys: set) -> dict:
+    """
+    Resolve dimension rows by their natural key, e.g. fetch_dimensions(session, Genre, ('name',), {'Drama'}).
+
+    Cached rows are attached to the session without a query, the rest are loaded with a keyed IN lookup
+    (instead of loading the whole table). Returns {key: row} for the keys found, where key is a
+    single value or a tuple for composite keys.
+    """
+    found = {}
+    misses = []
+    for key in keys:
+        row_id = dimension_cache.get(model, key)
+        if row_id is None:
+            misses.append(key)
+            continue
+
+        identity = session.identity_key(model, row_id)
+        row = session.identity_map.get(identity)
+        if row is None:
+            values = key if len(key_columns) > 1 else (key,)
+            row = model(id=row_id, **dict(zip(key_columns, values)))
+            make_transient_to_detached(row)
+            session.add(row)
+        found[key] = row
+
+    columns = [getattr(model, c) for c in key_columns]
+    for chunk in chunked(misses):
+        if len(columns) == 1:
+            query = session.query(model).filter(columns[0].in_(chunk))
+        else:
+            query = session.query(model).filter(tuple_(*columns).in_(chunk))
+
+        for row in query:
+            values = tuple(getattr(row, c) for c in key_columns)
+            key = values if len(key_columns) > 1 else values[0]
+            found[key] = row
+            dimension_cache.put(model, key, row.id)
+
+    return found
+
+
+def add_dimension(session, model, key, row):
+    """
+    Add a new dimension row to the session. Its id is only known after the flush (and may be rolled
+    back), so the cache entry is dropped and the next lookup reads it from the database.
+    """
+    session.add(row)
+    dimension_cache.discard(model, key)
+
+
+def normalize_character(character_name):
+    if character_name:
+        character_name = str(character_name or None).strip() # safely convert None to '' and strip spaces
+
+    if not character_name: # if empty after stripping
+        character_name = 'NO CHARACTER' # if no character data then set it to default "NO CHARACTER" as the actor might've been a background char or special case
+    return character_name
+
+
 def insert_genres(session, genres: list):
-    existing_genres = {g.name: g for g in session.query(Genre).all()}
+    existing_genres = fetch_dimensions(session, Genre, ('name',), {g for g in genres if g and isinstance(g, str)})
 
     for genre_name in genres:
         if not genre_name and not isinstance(genre_name, str): # skip of genre_name not a string
@@ -668,14 +1063,15 @@ def insert_genres(session, genres: list):
         genre = existing_genres.get(genre_name)
         if not genre:
             genre = Genre(name=genre_name)
-            session.add(genre)
+            add_dimension(session, Genre, genre_name, genre)
             existing_genres[genre_name] = genre
 
     return existing_genres
 
 
 def insert_content_ratings(session, content_ratings: list[dict]):
-    existing_ratings = {(cr.rating, cr.country): cr for cr in session.query(ContentRating).all()}
+    rating_keys = {(cr.get('rating'), cr.get('iso_3166_1')) for cr in content_ratings}
+    existing_ratings = fetch_dimensions(session, ContentRating, ('rating', 'country'), {k for k in rating_keys if k[0] and k[1]})
 
     for rating_data in content_ratings:
         rating_key = (rating_data.get('rating'), rating_data.get('iso_3166_1'))
@@ -686,16 +1082,14 @@ def insert_content_ratings(session, content_ratings: list[dict]):
         if rating_key not in existing_ratings:
             new_rating = ContentRating(rating=rating_data.get('rating'),
                                        country=rating_data.get('iso_3166_1'))
-            session.add(new_rating)
+            add_dimension(session, ContentRating, rating_key, new_rating)
             existing_ratings[rating_key] = new_rating
 
     return existing_ratings
 
 
 def insert_production_companies(session, companies: list[dict]):
-    existing_companies = {
-        c.name: c for c in session.query(ProductionCompany).all()
-    }
+    existing_companies = fetch_dimensions(session, ProductionCompany, ('name',), {c.get('name') for c in companies if c.get('name')})
 
     for company in companies:
         name = company.get('name')
@@ -710,14 +1104,14 @@ def insert_production_companies(session, companies: list[dict]):
                 logo_path=company.get("logo_path"),
                 origin_country=company.get("origin_country")
             )
-            session.add(new_company)
+            add_dimension(session, ProductionCompany, name, new_company)
             existing_companies[name] = new_company
 
     return existing_companies
 
 
 def insert_networks(session, networks: list[dict]):
-    existing_networks = {n.name: n for n in session.query(Network).all()}
+    existing_networks = fetch_dimensions(session, Network, ('name',), {n.get('name') for n in networks if n.get('name')})
 
     for network_data in networks:
         name = network_data.get('name')
@@ -731,33 +1125,29 @@ def insert_networks(session, networks: list[dict]):
                 name=name,
                 logo_path=network_data.get("logo_path"),
                 origin_country=network_data.get("origin_country"))
-            session.add(new_net)
+            add_dimension(session, Network, name, new_net)
             existing_networks[name] = new_net
 
     return existing_networks
 
 
 def insert_characters(session, characters: list):
-    existing_characters = {c.character: c for c in session.query(Character).all()}
+    existing_characters = fetch_dimensions(session, Character, ('character',), {normalize_character(c) for c in characters})
 
     for character_name in characters:    
-        if character_name:
-            character_name = str(character_name or None).strip() # safely convert None to '' and strip spaces
-
-        if not character_name: # if empty after stripping
-            character_name = 'NO CHARACTER' # if no character data then set it to default "NO CHARACTER" as the actor might've been a background char or special case
+        character_name = normalize_character(character_name)
 
         character = existing_characters.get(character_name)
         if not character:
             character = Character(character=character_name)
-            session.add(character)
+            add_dimension(session, Character, character_name, character)
             existing_characters[character_name] = character
 
     return existing_characters
 
 
 def insert_actors(session, actors: list[dict]):
-    existing_actors = {a.tmdb_id: a for a in session.query(Actor).all()}
+    existing_actors = fetch_dimensions(session, Actor, ('tmdb_id',), {a.get('id') for a in actors if a.get('id')})
 
     for actor_data in actors:
         tmdb_id = actor_data.get('id')
@@ -774,7 +1164,7 @@ def insert_actors(session, actors: list[dict]):
                               popularity=actor_data.get("popularity"),
                               profile_path=actor_data.get("profile_path"),
                               entry_updated=int(datetime.now(timezone.utc).timestamp()))
-            session.add(new_actor)
+            add_dimension(session, Actor, tmdb_id, new_actor)
             existing_actors[tmdb_id] = new_actor
 
     return existing_actors
@@ -1074,26 +1464,20 @@ def append_tv_episode(session, season: TvSeason, episode_data: dict):
     return new_episode
 
 
-def append_cast(session, item: MediaItem, existing_characters: dict[str, Character], existing_actors: dict[str, Actor], cast_data: list[dict], clear_existing: bool = True):
-    if clear_existing:
-        for mc in list(item.media_cast):
-            session.delete(mc)
-        session.flush()
-        existing_cast = {}
-    else:
-        # Map existing cast_data entries on this media item
-        existing_cast = {(mc.actor_id, mc.character_id): mc for mc in item.media_cast}
+def append_cast(session, item: MediaItem, existing_characters: dict[str, Character], existing_actors: dict[str, Actor], cast_data: list[dict], clear_existing: bool = True) -> int:
+    """
+    Sync the media_cast rows of `item` with `cast_data`, keyed on (media_id, actor_id, character_id).
 
+    Only added, removed (when `clear_existing`) or changed rows are written: new and changed rows with
+    one INSERT ... ON CONFLICT DO UPDATE per chunk, removed rows with one DELETE per chunk.
+    Returns the number of rows written.
+    """
+    session.flush() # new actors/characters need their ids
+
+    wanted = {}
     for entry in cast_data:
         actor_tmdb_id = entry.get('id')
-        character_name = entry.get('character')
-        episode_count = entry.get('episode_count')
-
-        # Normalize character name
-        if character_name:
-            character_name = str(character_name or '').strip()
-        if not character_name:
-            character_name = 'NO CHARACTER'
+        character_name = normalize_character(entry.get('character'))
 
         actor_obj = existing_actors.get(actor_tmdb_id)
         character_obj = existing_characters.get(character_name)
@@ -1102,26 +1486,38 @@ def append_cast(session, item: MediaItem, existing_characters: dict[str, Charact
             logger.warning(f"skipping invalid actor/character ({actor_obj}/{character_obj})")
             continue
 
-        key = (actor_obj.id, character_obj.id)
+        wanted[(actor_obj.id, character_obj.id)] = entry.get('episode_count')
 
-        if key in existing_cast:
-            # Update existing cast entry if needed
-            mc = existing_cast[key]
-            if mc.episode_count != episode_count:
-                mc.episode_count = episode_count
-                session.add(mc)
-        else:
-            # Insert new cast entry
-            new_cast = MediaCast(
-                media_item=item,
-                actor_id=actor_obj.id,
-                character_id=character_obj.id,
-                episode_count=episode_count,
-                entry_updated=int(datetime.now(timezone.utc).timestamp())
-            )
-            item.media_cast.append(new_cast)
-            session.add(new_cast)
+    existing_cast = {
+        (actor_id, character_id): episode_count
+        for actor_id, character_id, episode_count in session.execute(
+            select(MediaCast.actor_id, MediaCast.character_id, MediaCast.episode_count).where(MediaCast.media_id == item.id))
+    }
+
+    now = int(datetime.now(timezone.utc).timestamp())
+    upserts = [
+        {'media_id': item.id, 'actor_id': actor_id, 'character_id': character_id, 'episode_count': episode_count, 'entry_updated': now}
+        for (actor_id, character_id), episode_count in wanted.items()
+        if (actor_id, character_id) not in existing_cast or existing_cast[(actor_id, character_id)] != episode_count
+    ]
+    removed = [key for key in existing_cast if key not in wanted] if clear_existing else []
+
+    for chunk in chunked(upserts):
+        stmt = sqlite_insert(MediaCast).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MediaCast.media_id, MediaCast.actor_id, MediaCast.character_id],
+            set_={'episode_count': stmt.excluded.episode_count, 'entry_updated': stmt.excluded.entry_updated})
+        session.execute(stmt)
 
+    for chunk in chunked(removed):
+        session.execute(
+            delete(MediaCast).where(MediaCast.media_id == item.id, tuple_(MediaCast.actor_id, MediaCast.character_id).in_(chunk)),
+            execution_options={'synchronize_session': False})
+
+    if upserts or removed:
+        session.expire(item, ['media_cast'])
+
+    return len(upserts) + len(removed)
 
 
 
@@ -1134,13 +1530,46 @@ def insert_new(data: dict):
     with Session() as session:
         item = MediaItem(title=data['title'], release_date=data['release_date'], media_type=data['media_type'], hash_key=data['hash_key'], entry_created=int(datetime.now(timezone.utc).timestamp()))
         session.add(item)
+        session.flush()
+        refresh_search_index(session, [item.id])
         session.commit()
         id = item.id
 
+    notify_library_change([id])
     logger.info(f"successfully inserted: '{data.get('media_type')}', '{data.get('title')}' (ID {id})")
     return id
 
 
+def video_metadata_values(media_id: int, data: dict) -> dict:
+    """
+    Column values of a media_metadata row from the video data built by library_manager.
+    """
+    return {
+        'media_id': media_id,
+        'season_number': data.get('season_number'),
+        'episode_number': data.get('episode_number'),
+        'file_path': data.get('file_path'),
+        'hash_key': data.get('hash_key'),
+        'keyframe_path': data.get('key_frame'),
+        'source_size': data.get('source_size'),
+        'content_hash': data.get('content_hash'),
+        'transcoded': data.get('transcoded'),
+
+        'resolution': data.get('resolution'),
+        'extension': data.get('extension'),
+        'audio_codec': data.get('audio_codec'),
+        'video_codec': data.get('video_codec'),
+        'size': data.get('size'),
+        'bitrate': data.get('bitrate'),
+        'duration': data.get('duration'),
+        'frame_rate': data.get('frame_rate'),
+        'width': data.get('width'),
+        'height': data.get('height'),
+        'aspect_ratio': data.get('aspect_ratio'),
+        'entry_updated': int(datetime.now(timezone.utc).timestamp())
+    }
+
+
 def insert_video_file(id, data: dict):
     """
     returns row id for video in media_metadata table
@@ -1151,32 +1580,13 @@ def insert_video_file(id, data: dict):
             logger.debug(f'error, item ({id}) not found in database')
             return
         
-        video = VideoMetadata(
-            media_id=item.id,
-            season_number=data.get('season_number'),
-            episode_number=data.get('episode_number'),
-            file_path=data.get('file_path'),
-            hash_key=data.get('hash_key'),
-            keyframe_path=data.get('key_frame'),
-
-            resolution=data.get('resolution'),
-            extension=data.get('extension'),
-            audio_codec=data.get('audio_codec'),
-            video_codec=data.get('video_codec'),
-            size=data.get('size'),
-            bitrate=data.get('bitrate'),
-            duration=data.get('duration'),
-            frame_rate=data.get('frame_rate'),
-            width=data.get('width'),
-            height=data.get('height'),
-            aspect_ratio=data.get('aspect_ratio'),
-            entry_updated=int(datetime.now(timezone.utc).timestamp())
-            )
+        video = VideoMetadata(**video_metadata_values(item.id, data))
         item.media_metadata.append(video)
         item.new_video_inserted = int(datetime.now(timezone.utc).timestamp())
         session.commit()
         video_id = video.id
 
+    notify_library_change([id])
     return video_id
 
 
@@ -1204,6 +1614,174 @@ def insert_subtitles(video_id, subtitles: list[dict]):
                 )
             session.add(subtitle)
         session.commit()
+        media_ids = [video.media_id] if video else []
+
+    notify_library_change(media_ids)
+
+
+def chunked(rows: list, size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def insert_new_bulk(items: list[dict]) -> dict[str, int]:
+    """
+    Insert new tv series / movies in chunked transactions (one multi-row INSERT per chunk).
+
+    A chunk that fails (e.g. a hash_key inserted in the meantime) is retried row by row with insert_new(),
+    so one bad entry doesn't drop the whole chunk.
+
+    Returns { hash_key: row id } of inserted items.
+    """
+    ids = {}
+    for chunk in chunked(items):
+        now = int(datetime.now(timezone.utc).timestamp())
+        rows = [{'title': data['title'], 'release_date': data['release_date'], 'media_type': data['media_type'], 'hash_key': data['hash_key'], 'entry_created': now} for data in chunk]
+
+        try:
+            with Session() as session:
+                result = session.execute(insert(MediaItem).values(rows).returning(MediaItem.id, MediaItem.hash_key))
+                chunk_ids = {hash_key: id for id, hash_key in result}
+                refresh_search_index(session, list(chunk_ids.values()))
+                session.commit()
+        except IntegrityError:
+            logger.warning(f'bulk insert of {len(rows)} item(s) failed, retrying one by one...', exc_info=True)
+            chunk_ids = {}
+            for data in chunk:
+                try:
+                    chunk_ids[data['hash_key']] = insert_new(data)
+                except Exception:
+                    logger.error(f"failed to insert item with title '{data.get('title', 'Unknown')}' and hash_key '{data.get('hash_key')}' into database.", exc_info=True)
+            ids.update(chunk_ids)
+            continue
+
+        ids.update(chunk_ids)
+        notify_library_change(list(chunk_ids.values()))
+        logger.info(f'successfully inserted {len(chunk_ids)} item(s)')
+    return ids
+
+
+def insert_video_files_bulk(videos: list[tuple[int, dict]]) -> dict[str, int]:
+    """
+    Insert videos in chunked transactions, and mark their items with `new_video_inserted`.
+
+    Params:
+        videos (list): (media_id, video_data) tuples
+
+    Returns { video hash_key: row id in media_metadata } of inserted videos.
+    """
+    ids = {}
+    for chunk in chunked(videos):
+        rows = [video_metadata_values(media_id, data) for media_id, data in chunk]
+
+        try:
+            with Session() as session:
+                result = session.execute(insert(VideoMetadata).values(rows).returning(VideoMetadata.id, VideoMetadata.hash_key))
+                chunk_ids = {hash_key: id for id, hash_key in result}
+                session.execute(
+                    update(MediaItem)
+                    .where(MediaItem.id.in_({media_id for media_id, _ in chunk}))
+                    .values(new_video_inserted=int(datetime.now(timezone.utc).timestamp()))
+                )
+                session.commit()
+            notify_library_change(list({media_id for media_id, _ in chunk}))
+        except IntegrityError:
+            logger.warning(f'bulk insert of {len(rows)} video(s) failed, retrying one by one...', exc_info=True)
+            chunk_ids = {}
+            for media_id, data in chunk:
+                try:
+                    chunk_ids[data.get('hash_key')] = insert_video_file(media_id, data)
+                except Exception:
+                    logger.error(f"failed to insert video '{data.get('file_path')}' into database.", exc_info=True)
+
+        ids.update(chunk_ids)
+    return ids
+
+
+def update_content_keys(videos: list[dict]):
+    """
+    Set the duplicate detection columns (source_size, content_hash, transcoded) of existing videos,
+    `videos` are dicts with the row 'id' and the columns to set.
+    """
+    for chunk in chunked(videos):
+        with Session() as session:
+            session.execute(update(VideoMetadata), chunk)
+            session.commit()
+
+
+def insert_subtitles_bulk(subtitles: dict[int, list[dict]]) -> dict[str, int]:
+    """
+    Insert subtitles of many videos in chunked transactions.
+
+    Params:
+        subtitles (dict): { video_id (row id in media_metadata): [subtitle_data, ...] }
+
+    Returns { subtitle hash_key: row id } of inserted subtitles.
+    """
+    if not subtitles:
+        return {}
+
+    with ReadSession() as session:
+        media_ids = dict(session.query(VideoMetadata.id, VideoMetadata.media_id).filter(VideoMetadata.id.in_(list(subtitles))).all())
+
+    rows = []
+    now = int(datetime.now(timezone.utc).timestamp())
+    for video_id, subtitle_list in subtitles.items():
+        if video_id not in media_ids:
+            logger.debug(f'error, video ({video_id}) not found in database')
+            continue
+
+        for subtitle_data in subtitle_list:
+            if not subtitle_data.get('path'):
+                logger.debug(f'subtitle path not found. video: {video_id}')
+                continue
+            rows.append({
+                'media_id': media_ids[video_id],
+                'video_id': video_id,
+                'lang': subtitle_data.get('lang'),
+                'label': subtitle_data.get('label'),
+                'file_path': subtitle_data.get('path'),
+                'hash_key': subtitle_data.get('hash_key'),
+                'entry_updated': now
+            })
+
+    ids = {}
+    for chunk in chunked(rows):
+        try:
+            with Session() as session:
+                result = session.execute(insert(Subtitle).values(chunk).returning(Subtitle.id, Subtitle.hash_key))
+                ids.update({hash_key: id for id, hash_key in result})
+                session.commit()
+        except IntegrityError:
+            logger.warning(f'bulk insert of {len(chunk)} subtitle(s) failed, skipping already existing ones...', exc_info=True)
+            for row in chunk:
+                try:
+                    with Session() as session:
+                        result = session.execute(insert(Subtitle).values(row).returning(Subtitle.id))
+                        ids[row['hash_key']] = result.scalar_one()
+                        session.commit()
+                except IntegrityError:
+                    logger.debug(f"subtitle already in database: '{row['file_path']}'")
+
+    notify_library_change(list({row['media_id'] for row in rows}))
+    return ids
+
+
+def item_snapshot(item: MediaItem) -> tuple:
+    """
+    The related rows of `item` that update_id() clears and re-adds (genres, ..., trailers, logos) or
+    creates without update_attrs_if_changed() (seasons, episodes), to tell whether an update changed them.
+    """
+    tv = item.tv_details
+    return (
+        frozenset(g.id for g in item.genres),
+        frozenset(r.id for r in item.content_ratings),
+        frozenset(c.id for c in item.production_companies),
+        frozenset(n.id for n in item.networks),
+        frozenset((v.key, v.lang, v.title, v.site, v.type, v.official, v.published_at) for v in item.videos),
+        frozenset((l.file_path, l.lang, l.aspect_ratio, l.height, l.width) for l in item.logos),
+        frozenset((season.season_number, len(season.episodes)) for season in tv.seasons) if tv else None
+    )
 
 
 def update_id(id, data: dict):
@@ -1214,6 +1792,7 @@ def update_id(id, data: dict):
             logger.warning(f'update failed, item ({id}) not found in database')
             return  
 
+        before = item_snapshot(item)
 
         existing_genres = insert_genres(session, data.get('genres', []))
         existing_content_ratings = insert_content_ratings(session, data.get('content_ratings', []))
@@ -1230,7 +1809,7 @@ def update_id(id, data: dict):
         append_networks(session, item, existing_networks, data.get('networks', []))
         append_videos(session, item, data.get('videos', []))
         append_logos(session, item, data.get('logos', []))
-        append_cast(session, item, existing_characters, existing_actors, data.get('cast', []))
+        cast_written = append_cast(session, item, existing_characters, existing_actors, data.get('cast', []))
 
 
         if item.media_type == MediaType.MOVIE:
@@ -1245,22 +1824,55 @@ def update_id(id, data: dict):
                     append_tv_episode(session, tv_season, episode_data)
 
 
-        if last_updated_flag:
+        session.flush()
+        # also when only related rows changed (genres, seasons, cast, ...), API validators (ETags) are built from entry_updated
+        if last_updated_flag or cast_written or item_snapshot(item) != before:
             item.entry_updated = int(datetime.now(timezone.utc).timestamp())
 
+        refresh_search_index(session, [item.id])
         session.commit()
-        logger.info(f"Successfully updated: '{data.get('media_type')}', '{data.get('title')}'. (ID {id})")
+        notify_library_change([item.id])
+        logger.info(f"Successfully updated: '{data.get('media_type')}', '{data.get('title')}'. (ID {id}, {cast_written} cast row(s) written)")
+
+
+def add_tombstones(session, kind: str, rows):
+    """
+    Record the (user key, item id) rows selected by `rows` as deleted, see UserTombstone.
+    Tombstones older than TOMBSTONE_RETENTION_DAYS are pruned.
+    """
+    now = int(datetime.now(timezone.utc).timestamp())
+    session.execute(insert(UserTombstone).from_select(
+        ['user_key', 'item_id', 'kind', 'entry_updated'],
+        rows.add_columns(literal(kind), literal(now))))
+    session.execute(
+        delete(UserTombstone).where(UserTombstone.entry_updated < now - TOMBSTONE_RETENTION_DAYS * 86400),
+        execution_options={'synchronize_session': False})
 
 
-def delete_metadata_videos(missing_video_hashes: list):
+def delete_metadata_videos(missing_video_hashes: list) -> dict[str, int]:
+    """
+    Delete videos (and their subtitles and playback rows) by hash_key with a few set-based
+    statements per chunk of hashes, in one transaction. Returns the deleted row counts.
+    """
+    counts = {'videos': 0, 'subtitles': 0, 'playback': 0}
+    no_sync = {'synchronize_session': False} # nothing is loaded in this session
+    media_ids = set()
+
     with Session() as session:
-        for hash_key in missing_video_hashes:
-            video = session.query(VideoMetadata).filter_by(hash_key=hash_key).one_or_none()
-            if video:
-                session.query(UserPlayback).filter_by(video_id=video.id).delete(synchronize_session=False)
-                session.delete(video)
+        for chunk in chunked(list(missing_video_hashes)):
+            video_ids = select(VideoMetadata.id).where(VideoMetadata.hash_key.in_(chunk)).scalar_subquery()
+            media_ids.update(session.scalars(select(VideoMetadata.media_id).where(VideoMetadata.hash_key.in_(chunk)).distinct()))
+
+            counts['subtitles'] += session.execute(delete(Subtitle).where(Subtitle.video_id.in_(video_ids)), execution_options=no_sync).rowcount
+            add_tombstones(session, 'video', select(UserPlayback.user_key, UserPlayback.video_id).where(UserPlayback.video_id.in_(video_ids)))
+            counts['playback'] += session.execute(delete(UserPlayback).where(UserPlayback.video_id.in_(video_ids)), execution_options=no_sync).rowcount
+            counts['videos'] += session.execute(delete(VideoMetadata).where(VideoMetadata.hash_key.in_(chunk)), execution_options=no_sync).rowcount
         session.commit()
 
+    notify_library_change(list(media_ids))
+    logger.info(f"deleted {counts['videos']} video(s), {counts['subtitles']} subtitle(s) and {counts['playback']} playback row(s)")
+    return counts
+
 
 
 
@@ -1307,11 +1919,119 @@ def insert_new_user(password: str, key: str, is_admin=False, is_adult=True):
 
 class DB():
     @staticmethod
-    def fetch_catalog_index():
-        with Session() as session:
-            items = session.query(MediaItem.id, MediaItem.title, MediaItem.media_type).all()
+    def fetch_catalog_index(ids: list[int] = None):
+        with ReadSession() as session:
+            query = session.query(MediaItem.id, MediaItem.title, MediaItem.media_type)
+            if ids is not None:
+                query = query.filter(MediaItem.id.in_(ids))
+            items = query.all()
         return items
+
+
+    @staticmethod
+    def fetch_search_terms(ids: list[int] = None):
+        """
+        Other names an item can be searched by: { media id: [original title, cast names...] }.
+        """
+        terms = {}
+        with ReadSession() as session:
+            originals = session.query(MediaItem.id, MediaItem.original_title).filter(MediaItem.original_title.isnot(None))
+            cast = session.query(MediaCast.media_id, Actor.name).join(Actor, Actor.id == MediaCast.actor_id).distinct()
+            if ids is not None:
+                originals = originals.filter(MediaItem.id.in_(ids))
+                cast = cast.filter(MediaCast.media_id.in_(ids))
+
+            for media_id, name in originals.all() + cast.all():
+                if name:
+                    terms.setdefault(media_id, []).append(name)
+        return terms
     
+    @staticmethod
+    def fetch_library_version() -> tuple:
+        """
+        (item count, last entry_updated, last new_video_inserted) of the whole library, changes whenever a
+        list of titles (catalog, index, search) may have.
+        """
+        query = select(func.count(MediaItem.id), func.max(MediaItem.entry_updated), func.max(MediaItem.new_video_inserted))
+        with ReadSession() as session:
+            return tuple(session.execute(query).one())
+
+
+    @staticmethod
+    def fetch_item_version(id: int) -> tuple | None:
+        """
+        Timestamps and video / subtitle counts of a title, changes whenever one of its /content/v1/item
+        responses may have. None if the item does not exist.
+        """
+        query = select(
+            MediaItem.entry_updated,
+            MediaItem.new_video_inserted,
+            select(func.count()).select_from(VideoMetadata).where(VideoMetadata.media_id == id).scalar_subquery(),
+            select(func.max(VideoMetadata.entry_updated)).where(VideoMetadata.media_id == id).scalar_subquery(),
+            select(func.count()).select_from(Subtitle).where(Subtitle.media_id == id).scalar_subquery()
+        ).where(MediaItem.id == id)
+        with ReadSession() as session:
+            row = session.execute(query).one_or_none()
+        return tuple(row) if row else None
+
+
+    @staticmethod
+    def fetch_video_version(video_id: int) -> tuple | None:
+        """
+        Timestamps of a video, its title and its subtitles. None if the video does not exist.
+        """
+        query = select(
+            VideoMetadata.entry_updated,
+            MediaItem.entry_updated,
+            select(func.count()).select_from(Subtitle).where(Subtitle.video_id == video_id).scalar_subquery(),
+            select(func.max(Subtitle.entry_updated)).where(Subtitle.video_id == video_id).scalar_subquery()
+        ).join(MediaItem, MediaItem.id == VideoMetadata.media_id).where(VideoMetadata.id == video_id)
+        with ReadSession() as session:
+            row = session.execute(query).one_or_none()
+        return tuple(row) if row else None
+
+
+    @staticmethod
+    def fetch_catalog_cards(order_by='entry_updated', order_=desc, limit=20, media_type=None, after: tuple = None):
+        """
+        Same as fetch_catalog(), but selects only the columns of a catalog card (CARD_COLUMNS)
+        and returns lightweight rows (row.id, row.title, ...) instead of full MediaItem objects.
+
+        Cards are ordered by (order_by, id). `after` is the (value, id) of the last card of the previous page:
+        the next page starts right behind it with an index range scan (keyset pagination), so deep pages cost
+        the same as the first one. SQLite sorts NULLs first, so cards without a value are read as their own
+        segment, before the others ascending and after them descending.
+        """
+        column = getattr(MediaItem, order_by, None)
+        if column is None:
+            raise ValueError(f"Invalid column name: '{order_by}'")
+
+        ascending = order_ is asc
+        query = select(*(getattr(MediaItem, c) for c in CARD_COLUMNS)).order_by(order_(column), order_(MediaItem.id))
+        if media_type:
+            query = query.where(MediaItem.media_type == media_type)
+
+        segments = [True, False] if ascending else [False, True] # NULL segment first ascending, last descending
+        if after:
+            segments = segments[segments.index(after[0] is None):]
+
+        rows = []
+        with ReadSession() as session:
+            for nulls in segments:
+                segment = query.where(column.is_(None) if nulls else column.is_not(None))
+                if after and nulls == (after[0] is None): # the segment the previous page ended in
+                    value, id = after
+                    if nulls:
+                        segment = segment.where(MediaItem.id > id if ascending else MediaItem.id < id)
+                    else:
+                        position, last = tuple_(column, MediaItem.id), tuple_(value, id)
+                        segment = segment.where(position > last if ascending else position < last)
+                rows += session.execute(segment.limit(limit - len(rows))).all()
+                if len(rows) >= limit:
+                    break
+        return rows
+
+
     @staticmethod
     def fetch_catalog(order_by='entry_updated', order_=desc, limit=20, media_type=None):
         """
@@ -1327,7 +2047,7 @@ class DB():
             List[MediaItem]: A list of MediaItem objects.
         """
 
-        with Session() as session:
+        with ReadSession() as session:
             # Get the column object by name
             column = getattr(MediaItem, order_by, None)
             if column is None:
@@ -1354,35 +2074,120 @@ class DB():
 
     @staticmethod
     def fetch_id(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.genres), joinedload(MediaItem.logos)).one_or_none()
         return item
 
 
+    @staticmethod
+    def fetch_item_page(id):
+        """
+        Everything the title page shows, loaded in one session: the item with genres, logos, content
+        ratings, networks, movie / tv details and videos with subtitles (one SELECT per relationship),
+        and the episodes of its videos. Returns (item, episodes), or (None, []) if it does not exist.
+        """
+        with ReadSession() as session:
+            item = session.query(MediaItem).filter_by(id=id).options(
+                selectinload(MediaItem.genres),
+                selectinload(MediaItem.logos),
+                selectinload(MediaItem.content_ratings),
+                selectinload(MediaItem.networks),
+                joinedload(MediaItem.movie_details),
+                joinedload(MediaItem.tv_details),
+                selectinload(MediaItem.media_metadata).selectinload(VideoMetadata.subtitles)
+            ).one_or_none()
+            if not item:
+                return None, []
+
+            numbers = list({(v.season_number, v.episode_number) for v in item.media_metadata if v.season_number is not None and v.episode_number is not None})
+            episodes = []
+            for chunk in chunked(numbers):
+                episodes += session.query(TvEpisode).filter(
+                    TvEpisode.media_id == id,
+                    tuple_(TvEpisode.season_number, TvEpisode.episode_number).in_(chunk)
+                ).all()
+        return item, episodes
+
+
+    @staticmethod
+    def fetch_items(ids: list[int], after: str):
+        """
+        Items of `ids` with genres, logos and movie / tv details (one SELECT per relationship), and the first
+        episode of each tv show airing after `after` (YYYY-MM-DD), see fetch_next_episode().
+        Returns ({id: item}, {media_id: episode}), missing ids are left out.
+        """
+        with ReadSession() as session:
+            items = session.query(MediaItem).filter(MediaItem.id.in_(ids)).options(
+                selectinload(MediaItem.genres),
+                selectinload(MediaItem.logos),
+                joinedload(MediaItem.movie_details),
+                joinedload(MediaItem.tv_details)
+            ).all()
+
+            tv_ids = [item.id for item in items if item.media_type == 'tv']
+            next_episodes = {}
+            if tv_ids:
+                upcoming = session.query(
+                    TvEpisode.id,
+                    func.row_number().over(partition_by=TvEpisode.media_id, order_by=TvEpisode.air_date).label('rank')
+                ).filter(TvEpisode.media_id.in_(tv_ids), TvEpisode.air_date > after).subquery()
+                episodes = session.query(TvEpisode).join(upcoming, upcoming.c.id == TvEpisode.id).filter(upcoming.c.rank == 1).all()
+                next_episodes = {ep.media_id: ep for ep in episodes}
+        return {item.id: item for item in items}, next_episodes
+
+
+    @staticmethod
+    def fetch_videos_by_ids(video_ids: list[int]):
+        """
+        Videos of `video_ids` with subtitles, the episodes they are and the titles they belong to.
+        Returns ({id: video}, {(media_id, season_number, episode_number): episode}, {media_id: item}),
+        missing ids are left out.
+        """
+        with ReadSession() as session:
+            videos = session.query(VideoMetadata).filter(VideoMetadata.id.in_(video_ids)).options(
+                selectinload(VideoMetadata.subtitles)
+            ).all()
+
+            numbers = list({(v.media_id, v.season_number, v.episode_number) for v in videos if v.season_number is not None and v.episode_number is not None})
+            episodes = []
+            for chunk in chunked(numbers):
+                episodes += session.query(TvEpisode).filter(
+                    tuple_(TvEpisode.media_id, TvEpisode.season_number, TvEpisode.episode_number).in_(chunk)
+                ).all()
+
+            media_ids = list({v.media_id for v in videos})
+            items = session.query(MediaItem).filter(MediaItem.id.in_(media_ids)).all() if media_ids else []
+        return (
+            {v.id: v for v in videos},
+            {(ep.media_id, ep.season_number, ep.episode_number): ep for ep in episodes},
+            {item.id: item for item in items}
+        )
+
+
     @staticmethod
     def fetch_tv_details(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.tv_details)).one_or_none()
         return item
 
 
     @staticmethod
     def fetch_movie_details(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.movie_details)).one_or_none()
         return item
     
 
     @staticmethod
     def fetch_genres(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.genres)).one_or_none()
             return item.genres if item else []
 
 
     @staticmethod
     def fetch_cast(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(
                 joinedload(MediaItem.media_cast).joinedload(MediaCast.actor),
                 joinedload(MediaItem.media_cast).joinedload(MediaCast.character)
@@ -1392,98 +2197,186 @@ class DB():
 
     @staticmethod
     def fetch_trailers(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.videos)).one_or_none()
             return item.videos if item else []
 
 
     @staticmethod
     def fetch_networks(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.networks)).one_or_none()
             return item.networks if item else []
 
 
     @staticmethod
     def fetch_ratings(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.content_ratings)).one_or_none()
             return item.content_ratings if item else []
 
 
     @staticmethod
     def fetch_season(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.tv_details).joinedload(TvDetails.seasons).joinedload(TvSeason.episodes)).one_or_none()
             return item.tv_details.seasons if item and item.tv_details else []
 
 
+    @staticmethod
+    def iter_seasons(id):
+        """
+        Same as fetch_season(), as a generator of (season, [episodes]) read in one session: the episodes
+        come from one cursor in (season, id) order, STREAM_BATCH_SIZE rows at a time, so only one season's
+        episodes are held at once.
+        """
+        with ReadSession() as session:
+            seasons = session.scalars(
+                select(TvSeason).join(TvDetails, TvDetails.id == TvSeason.tv_id).where(TvDetails.media_id == id).order_by(TvSeason.id)
+            ).all()
+            if not seasons:
+                return
+
+            episodes = session.scalars(
+                select(TvEpisode).where(TvEpisode.season_id.in_([s.id for s in seasons])).order_by(TvEpisode.season_id, TvEpisode.id)
+                .execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            episode = next(episodes, None)
+            for season in seasons:
+                season_episodes = []
+                while episode is not None and episode.season_id == season.id:
+                    season_episodes.append(episode)
+                    episode = next(episodes, None)
+                yield season, season_episodes
+
+
     @staticmethod
     def fetch_episodes(id):
-        with Session() as session:
-            item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.tv_details).joinedload(TvDetails.seasons).joinedload(TvSeason.episodes)).one_or_none()
-            if not item or not item.tv_details:
-                return []
-            return [ep for season in item.tv_details.seasons for ep in season.episodes]
+        with ReadSession() as session:
+            return session.query(TvEpisode).filter_by(media_id=id).order_by(TvEpisode.season_number, TvEpisode.episode_number).all()
 
 
     @staticmethod
-    def fetch_episode(id: int, season_number: int, episode_number: int):
-        with Session() as session:
-            item = session.query(MediaItem).filter_by(id=id).options(
-                joinedload(MediaItem.tv_details)
-                .joinedload(TvDetails.seasons)
-                .joinedload(TvSeason.episodes)
-            ).one_or_none()
+    def fetch_episodes_by_number(id, numbers: list[tuple[int, int]]):
+        """
+        Episodes of a show for the given (season_number, episode_number) pairs only.
+        """
+        numbers = list({(s, e) for s, e in numbers if s is not None and e is not None})
+        with ReadSession() as session:
+            episodes = []
+            for chunk in chunked(numbers):
+                episodes += session.query(TvEpisode).filter(
+                    TvEpisode.media_id == id,
+                    tuple_(TvEpisode.season_number, TvEpisode.episode_number).in_(chunk)
+                ).all()
+            return episodes
 
-            if not item or not item.tv_details:
-                return None
 
-            for season in item.tv_details.seasons:
-                if season.season_number == season_number:
-                    for episode in season.episodes:
-                        if episode.episode_number == episode_number:
-                            return episode
-            return None
+    @staticmethod
+    def fetch_next_episode(id, after: str):
+        """
+        First episode airing after `after` (YYYY-MM-DD), or None.
+        """
+        with ReadSession() as session:
+            return session.query(TvEpisode).filter(
+                TvEpisode.media_id == id,
+                TvEpisode.air_date > after
+            ).order_by(TvEpisode.air_date).first()
+
+
+    @staticmethod
+    def fetch_episode(id: int, season_number: int, episode_number: int):
+        with ReadSession() as session:
+            return session.query(TvEpisode).filter_by(
+                media_id=id,
+                season_number=season_number,
+                episode_number=episode_number
+            ).first()
 
 
     @staticmethod
     def fetch_videos(id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(id=id).options(joinedload(MediaItem.media_metadata).joinedload(VideoMetadata.subtitles)).one_or_none()
         return item.media_metadata
 
 
     @staticmethod
     def fetch_video(video_id):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(VideoMetadata).filter_by(id=video_id).options(joinedload(VideoMetadata.subtitles)).one_or_none()
-        return item        
+        return item
+
+    @staticmethod
+    def fetch_playback_session(video_id: int, key: str):
+        """
+        Everything the watch page needs to start a video, loaded in one session: the video with subtitles,
+        its item, its episode, the previous / next video of the same item in (season, episode) order
+        as (id, season_number, episode_number, episode name) rows and the user's playback row.
+        Returns (video, item, episode, previous, following, playback), or None if the video does not exist.
+        """
+        with ReadSession() as session:
+            video = session.query(VideoMetadata).filter_by(id=video_id).options(selectinload(VideoMetadata.subtitles)).one_or_none()
+            if not video:
+                return None
+
+            item = session.get(MediaItem, video.media_id)
+            episode = None
+            previous = following = None
+            if video.season_number is not None and video.episode_number is not None:
+                episode = session.query(TvEpisode).filter_by(
+                    media_id=video.media_id,
+                    season_number=video.season_number,
+                    episode_number=video.episode_number
+                ).first()
+
+                position = tuple_(VideoMetadata.season_number, VideoMetadata.episode_number)
+                current = tuple_(video.season_number, video.episode_number)
+                siblings = session.query(
+                    VideoMetadata.id, VideoMetadata.season_number, VideoMetadata.episode_number, TvEpisode.name
+                ).outerjoin(TvEpisode, and_(
+                    TvEpisode.media_id == VideoMetadata.media_id,
+                    TvEpisode.season_number == VideoMetadata.season_number,
+                    TvEpisode.episode_number == VideoMetadata.episode_number
+                )).filter(
+                    VideoMetadata.media_id == video.media_id,
+                    VideoMetadata.season_number.is_not(None),
+                    VideoMetadata.episode_number.is_not(None)
+                )
+                previous = siblings.filter(position < current).order_by(
+                    VideoMetadata.season_number.desc(), VideoMetadata.episode_number.desc(), VideoMetadata.id.desc()
+                ).first()
+                following = siblings.filter(position > current).order_by(
+                    VideoMetadata.season_number, VideoMetadata.episode_number, VideoMetadata.id
+                ).first()
+
+            playback = session.query(UserPlayback).filter_by(user_key=key, video_id=video_id).one_or_none()
+        return video, item, episode, previous, following, playback
 
     @staticmethod
     def fetch_video_by_hash(key):
-        with Session() as session:
+        with ReadSession() as session:
             video = session.query(VideoMetadata).filter_by(hash_key=key).options(joinedload(VideoMetadata.subtitles)).one_or_none()
         return video
 
 
     @staticmethod
     def fetch_subtitles(video_id):
-        with Session() as session:
+        with ReadSession() as session:
             subtitles = session.query(Subtitle).filter_by(video_id=video_id).all()
             return subtitles if subtitles else []        
 
 
     @staticmethod
     def fetch_subtitle_by_hash(key):
-        with Session() as session:
+        with ReadSession() as session:
             subtitle = session.query(Subtitle).filter_by(hash_key=key).one_or_none()
             return subtitle 
 
 
     @staticmethod
     def fetch_catalog_by_genre(genre_name: str):
-        with Session() as session:
+        with ReadSession() as session:
             genre = session.query(Genre).options(joinedload(Genre.media_item)).filter_by(name=genre_name).first()
 
             if genre:
@@ -1493,51 +2386,169 @@ class DB():
 
     @staticmethod
     def fetch_hash_MediaItem():
-        with Session() as session:
+        with ReadSession() as session:
             hashes = session.query(MediaItem.hash_key).all()
         return [h[0] for h in hashes]
 
 
+    @staticmethod
+    def fetch_ids_by_hash_keys(keys: list[str]) -> dict[str, int]:
+        """
+        Returns { hash_key: MediaItem id } for the given item hash keys.
+        """
+        ids = {}
+        with ReadSession() as session:
+            for chunk in chunked(list(keys)):
+                ids.update(session.query(MediaItem.hash_key, MediaItem.id).filter(MediaItem.hash_key.in_(chunk)).all())
+        return ids
+
+
     @staticmethod
     def fetch_hash_VideoMetadata():
-        with Session() as session:
+        with ReadSession() as session:
             hashes = session.query(VideoMetadata.hash_key).all()
         return [h[0] for h in hashes]
 
 
+    @staticmethod
+    def fetch_videos_without_content_keys():
+        """
+        Videos stored before duplicate detection recorded whether they were transcoded (see VideoMetadata.transcoded).
+        Returns rows of: id, file_path, source_size, content_hash
+        """
+        with ReadSession() as session:
+            return (
+                session.query(VideoMetadata.id, VideoMetadata.file_path, VideoMetadata.source_size, VideoMetadata.content_hash)
+                .filter(VideoMetadata.transcoded.is_(None))
+                .order_by(VideoMetadata.id)
+                .all()
+            )
+
+
+    @staticmethod
+    def fetch_content_keys():
+        """
+        Returns { (source_size, content_hash): video hash_key } for videos with a known content hash.
+        """
+        with ReadSession() as session:
+            rows = (
+                session.query(VideoMetadata.source_size, VideoMetadata.content_hash, VideoMetadata.hash_key)
+                .filter(VideoMetadata.content_hash.isnot(None))
+                .order_by(VideoMetadata.id)
+                .all()
+            )
+        content_keys = {}
+        for source_size, content_hash, hash_key in rows:
+            content_keys.setdefault((source_size, content_hash), hash_key)
+        return content_keys
+
+
+    @staticmethod
+    def fetch_duplicate_videos():
+        """
+        Group videos whose source files share the same size and content hash.
+
+        Returns a list of dicts (biggest waste first):
+            { 'content_hash', 'source_size', 'wasted_bytes', 'videos': [{id, media_id, file_path, size}, ...] }
+        """
+        with ReadSession() as session:
+            duplicates = (
+                session.query(VideoMetadata.source_size, VideoMetadata.content_hash)
+                .filter(VideoMetadata.content_hash.isnot(None))
+                .group_by(VideoMetadata.source_size, VideoMetadata.content_hash)
+                .having(func.count(VideoMetadata.id) > 1)
+                .subquery()
+            )
+            videos = (
+                session.query(VideoMetadata)
+                .join(duplicates, and_(VideoMetadata.source_size == duplicates.c.source_size,
+                                       VideoMetadata.content_hash == duplicates.c.content_hash))
+                .order_by(VideoMetadata.id)
+                .all()
+            )
+
+        groups = {}
+        for video in videos:
+            group = groups.setdefault((video.source_size, video.content_hash), {
+                'content_hash': video.content_hash,
+                'source_size': video.source_size,
+                'wasted_bytes': 0,
+                'videos': []
+            })
+            group['videos'].append({'id': video.id, 'media_id': video.media_id, 'file_path': video.file_path, 'size': int(video.size or 0)})
+
+        for group in groups.values():
+            sizes, files = [], set()
+            for v in group['videos']:
+                try:
+                    stat = os.stat(v['file_path'])
+                    file_id = (stat.st_dev, stat.st_ino)
+                except (OSError, TypeError, ValueError):
+                    file_id = v['file_path']
+                if file_id in files:
+                    continue # hard link of a copy counted already (see reuse_transcoded_file), takes no extra space
+                files.add(file_id)
+                sizes.append(v['size'])
+            group['wasted_bytes'] = sum(sizes) - max(sizes) # every other copy is wasted space
+
+        return sorted(groups.values(), key=lambda g: g['wasted_bytes'], reverse=True)
+
+
     @staticmethod
     def fetch_by_hash_key(key):
-        with Session() as session:
+        with ReadSession() as session:
             item = session.query(MediaItem).filter_by(hash_key=key).one_or_none()
         return item
 
     @staticmethod
-    def search(input_str):
+    def search(input_str, limit: int = SEARCH_LIMIT):
         """
-        Search for media items where the title matches `input_str`.
+        Search for media items where any word of the title, original title, overview, genres or cast
+        starts with the words of `input_str`, best matches (bm25) first.
 
         Returns item obj.
         """
-        with Session() as session:
+        match = search_match_query(input_str)
+        if not match:
+            return []
+
+        with ReadSession() as session:
+            if not search_fts:
+                escaped = input_str.replace('\\', '\\\\').replace('%', r'\%').replace('_', r'\_')
+                return (
+                    session.query(MediaItem)
+                    .options(joinedload(MediaItem.genres))
+                    .filter(MediaItem.title.ilike(f"%{escaped}%", escape='\\'))
+                    .limit(limit)
+                    .all()
+                )
+
+            weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+            ids = session.execute(
+                text(f"SELECT rowid FROM media_search WHERE media_search MATCH :match ORDER BY bm25(media_search, {weights}) LIMIT :limit"),
+                {'match': match, 'limit': limit}
+            ).scalars().all()
+
             items = (
                 session.query(MediaItem)
                 .options(joinedload(MediaItem.genres))
-                .filter(MediaItem.title.ilike(f"%{input_str}%"))
+                .filter(MediaItem.id.in_(ids))
                 .all()
             )
-            return items
+            rank = {id: i for i, id in enumerate(ids)}
+            return sorted(items, key=lambda item: rank[item.id])
 
 
     @staticmethod
     def fetch_users():
-        with Session() as session:
+        with ReadSession() as session:
             users = session.query(User).all()
         return [{'hash': user.password, 'key': user.key, 'is_admin': user.is_admin, 'is_adult': user.is_adult} for user in users]
 
 
     @staticmethod
     def fetch_user(key):
-        with Session() as session:
+        with ReadSession() as session:
             user = session.query(User).filter_by(key=key).options(
                 joinedload(User.user_profile), 
                 joinedload(User.user_library), 
@@ -1547,92 +2558,247 @@ class DB():
 
 
     @staticmethod
-    def set_user_playback(key: str, data: dict):
-        media_id = data.get('media_id')
-        video_id = data.get('video_id')
-        video_paused_at = data.get('video_paused_at', 0)
-        seconds_played = data.get('seconds_played', 0)
-        is_watched = data.get('watched', False)
-        video_duration = data.get('video_duration', 0)
+    def fetch_user_video_playback(key: str, video_id: int):
+        """
+        The user's playback row of one video (resume position, watched), or None.
+        """
+        with ReadSession() as session:
+            return session.query(UserPlayback).filter_by(user_key=key, video_id=video_id).one_or_none()
 
-        if not all([key, data, data.get('media_id'), data.get('video_id')]):
-            logger.warning(f'failed to update user playback. (user: {key}, data: {data})')
 
+    @staticmethod
+    def fetch_user_media_state(key: str, media_id: int):
+        """
+        The user's library row (rated, watchlisted) of one title, or None, and their playback rows
+        of its videos.
+        """
+        with ReadSession() as session:
+            library = session.query(UserLibrary).filter_by(user_key=key, media_id=media_id).one_or_none()
+            playback = session.query(UserPlayback).filter_by(user_key=key, media_id=media_id).all()
+        return library, playback
 
-        with Session() as session:
-            user = session.query(User).filter_by(key=key).options(joinedload(User.user_playback)).one_or_none()
 
-            # Find existing playback for this user/media/video combo
-            playback = None
-            for p in user.user_playback:
-                if p.video_id == video_id and p.media_id == media_id:
-                    playback = p
-                    break
+    @staticmethod
+    def fetch_continue_watching(key: str, limit: int = CONTINUE_WATCHING_LIMIT):
+        """
+        The user's last watched video of each title, most recent titles first, in one statement.
+        When that video was finished, the next episode (season / episode order) the user has not
+        watched yet takes its place (`next_up`). Finished movies and shows stay as they are.
 
-            now_ts = int(datetime.utcnow().timestamp())
+        Returns rows of: media_id, media_type, title, poster_path, backdrop_path, last_watched, next_up,
+        video_id, season_number, episode_number, key_frame, name, still_path, watched, paused_at, duration
+        """
+        ranked = select(
+            UserPlayback.media_id,
+            UserPlayback.video_id,
+            UserPlayback.watched,
+            UserPlayback.entry_updated,
+            func.row_number().over(partition_by=UserPlayback.media_id, order_by=(UserPlayback.entry_updated.desc(), UserPlayback.id.desc())).label('rn')
+        ).where(UserPlayback.user_key == key, UserPlayback.video_id.is_not(None)).subquery('ranked')
+
+        latest = select(ranked).where(ranked.c.rn == 1).order_by(ranked.c.entry_updated.desc()).limit(limit).subquery('latest')
+
+        current, following, seen = aliased(VideoMetadata), aliased(VideoMetadata), aliased(UserPlayback)
+        next_video = (
+            select(following.id)
+            .where(
+                following.media_id == latest.c.media_id,
+                tuple_(following.season_number, following.episode_number) > tuple_(current.season_number, current.episode_number),
+                ~exists().where(seen.user_key == key, seen.video_id == following.id, seen.watched == True))
+            .order_by(following.season_number, following.episode_number)
+            .limit(1)
+            .correlate(latest, current)
+            .scalar_subquery()
+        )
+        resolved = (
+            select(latest.c.media_id, latest.c.video_id, latest.c.watched, latest.c.entry_updated, next_video.label('next_video_id'))
+            .join(current, current.id == latest.c.video_id)
+            .subquery('resolved')
+        )
 
-            if playback:
-                # Update existing record
-                playback.watched = is_watched 
-                playback.paused_at = video_paused_at
-                playback.watchtime = playback.watchtime + seconds_played if seconds_played != 0 else playback.watchtime_total
-                playback.entry_updated = now_ts
-            else:
-                # Create new UserPlayback record
-                playback = UserPlayback(
-                    user_key=user.key,
-                    media_id=media_id,
-                    video_id=video_id,
-                    watched=is_watched,
-                    paused_at=video_paused_at,
-                    video_duration = video_duration,
-                    watchtime=video_paused_at,
-                    entry_created=now_ts,
-                    entry_updated=now_ts,
-                    user=user
-                )
-                session.add(playback)
+        next_up = and_(resolved.c.watched == True, resolved.c.next_video_id.is_not(None))
+        feed = select(
+            resolved.c.media_id,
+            resolved.c.entry_updated.label('last_watched'),
+            next_up.label('next_up'),
+            case((next_up, resolved.c.next_video_id), else_=resolved.c.video_id).label('video_id')
+        ).subquery('feed')
+
+        progress = aliased(UserPlayback)
+        query = (
+            select(
+                feed.c.media_id, MediaItem.media_type, MediaItem.title, MediaItem.poster_path, MediaItem.backdrop_path,
+                feed.c.last_watched, feed.c.next_up, feed.c.video_id,
+                VideoMetadata.season_number, VideoMetadata.episode_number, VideoMetadata.keyframe_path.label('key_frame'),
+                TvEpisode.name, TvEpisode.still_path,
+                progress.watched, progress.paused_at, func.coalesce(progress.video_duration, VideoMetadata.duration).label('duration'))
+            .join(MediaItem, MediaItem.id == feed.c.media_id)
+            .join(VideoMetadata, VideoMetadata.id == feed.c.video_id)
+            .outerjoin(TvEpisode, and_(
+                TvEpisode.media_id == VideoMetadata.media_id,
+                TvEpisode.season_number == VideoMetadata.season_number,
+                TvEpisode.episode_number == VideoMetadata.episode_number))
+            .outerjoin(progress, and_(progress.user_key == key, progress.video_id == feed.c.video_id))
+            .order_by(feed.c.last_watched.desc())
+        )
+
+        with ReadSession() as session:
+            return session.execute(query).all()
+
+
+    @staticmethod
+    def fetch_watchlist_cards(key: str):
+        """
+        Catalog cards (CARD_COLUMNS) of the user's watchlisted titles, newest videos first.
+        """
+        query = (
+            select(*(getattr(MediaItem, c) for c in CARD_COLUMNS))
+            .join(UserLibrary, UserLibrary.media_id == MediaItem.id)
+            .where(UserLibrary.user_key == key, UserLibrary.watchlisted != 0)
+            .order_by(MediaItem.new_video_inserted.desc())
+        )
+        with ReadSession() as session:
+            return session.execute(query).all()
+
+
+    @staticmethod
+    def fetch_user_library_changes(key: str, since: int = None):
+        """
+        The user's library and playback rows changed at or after `since` (entry_updated), and the
+        tombstones of rows deleted since then. Without `since`, or when `since` is older than the kept
+        tombstones (or ahead of the clock), everything is returned and `full` is True.
 
+        Returns {'full': bool, 'library': [UserLibrary], 'videos': [UserPlayback], 'tombstones': [UserTombstone]}
+        """
+        changes = {}
+        for name, rows in DB.iter_user_library_changes(key, since):
+            changes[name] = rows if name == 'full' else list(rows)
+        return changes
+
+
+    @staticmethod
+    def iter_user_library_changes(key: str, since: int = None):
+        """
+        Same as fetch_user_library_changes(), as a generator of (name, value) sections read in one session:
+        ('full', bool), then ('library', rows), ('videos', rows) and ('tombstones', rows), the rows fetched
+        STREAM_BATCH_SIZE at a time. Each section's rows must be consumed before the next section is pulled.
+        """
+        now = int(datetime.now(timezone.utc).timestamp())
+        horizon = now - TOMBSTONE_RETENTION_DAYS * 86400
+        full = since is None or since < horizon or since > now # a cursor from the future was stamped with another clock
+
+        library = select(UserLibrary).where(UserLibrary.user_key == key)
+        videos = select(UserPlayback).where(UserPlayback.user_key == key)
+        tombstones = None
+        if not full:
+            library = library.where(UserLibrary.entry_updated >= since)
+            videos = videos.where(UserPlayback.entry_updated >= since)
+            tombstones = select(UserTombstone).where(UserTombstone.user_key == key, UserTombstone.entry_updated >= since)
+
+        with ReadSession() as session:
+            yield 'full', full
+            yield 'library', session.scalars(library.execution_options(yield_per=STREAM_BATCH_SIZE))
+            yield 'videos', session.scalars(videos.execution_options(yield_per=STREAM_BATCH_SIZE))
+            yield 'tombstones', session.scalars(tombstones) if tombstones is not None else iter(())
+
+
+    @staticmethod
+    def set_user_playback(key: str, data: dict):
+        """
+        Upsert the user's playback row of a video in one statement (unique on user_key, video_id).
+        """
+        DB.set_user_playback_bulk([(key, data)])
+
+
+    @staticmethod
+    def set_user_playback_bulk(updates: list[tuple[str, dict]]):
+        """
+        Upsert playback rows [(user key, data), ...] in one transaction, see set_user_playback().
+        `seconds_played` is added to the stored watchtime, everything else replaces the stored values.
+        """
+        rows = []
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        for key, data in updates:
+            if not all([key, data, data.get('media_id'), data.get('video_id')]):
+                logger.warning(f'failed to update user playback. (user: {key}, data: {data})')
+                continue
+
+            rows.append({
+                'key': key,
+                'media_id': data.get('media_id'),
+                'video_id': data.get('video_id'),
+                'watched': data.get('watched', False),
+                'paused_at': data.get('video_paused_at', 0),
+                'seconds_played': data.get('seconds_played', 0),
+                'video_duration': data.get('video_duration', 0),
+                'now': data.get('entry_updated', now_ts)
+            })
+        if not rows:
+            return
+
+        values = select(
+            User.key,
+            bindparam('media_id'),
+            bindparam('video_id'),
+            bindparam('watched', type_=Boolean),
+            bindparam('paused_at'),
+            bindparam('video_duration'),
+            bindparam('paused_at'), # watchtime of a new row
+            bindparam('now'),
+            bindparam('now')
+        ).where(User.key == bindparam('key')) # no row for unknown users
+
+        stmt = sqlite_insert(UserPlayback).from_select(
+            ['user_key', 'media_id', 'video_id', 'watched', 'paused_at', 'video_duration', 'watchtime', 'entry_created', 'entry_updated'],
+            values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserPlayback.user_key, UserPlayback.video_id],
+            set_={
+                'media_id': stmt.excluded.media_id,
+                'watched': stmt.excluded.watched,
+                'paused_at': stmt.excluded.paused_at,
+                'watchtime': func.coalesce(UserPlayback.watchtime, 0) + bindparam('seconds_played'),
+                'entry_updated': stmt.excluded.entry_updated
+            })
+
+        with Session() as session:
+            session.connection().execute(stmt, rows)
             session.commit()
 
 
     @staticmethod
     def set_user_library(key: str, data: dict):
+        """
+        Upsert the user's library row of a title in one statement (unique on user_key, media_id).
+        `rated` / `watchlisted` left out (None) keep their current value.
+        """
         media_id = data.get('media_id')
         watchlisted = data.get('watchlisted')
         rated = data.get('rated')
 
-        with Session() as session:
-            user = session.query(User).filter_by(key=key).options(joinedload(User.user_library)).one_or_none()
-
-            
-
-            library_item = None
-            for l in user.user_library:
-                if l.media_id == media_id:
-                    library_item = l
-                    break
-
-            now_ts = int(datetime.utcnow().timestamp())
-
-            if library_item:
-                # Update existing record
-                library_item.rated = rated  if rated is not None else library_item.rated
-                library_item.watchlisted = watchlisted if watchlisted is not None else library_item.watchlisted
-                library_item.entry_updated = now_ts
-            else:
-                # Create new
-                library_item = UserLibrary(
-                    user_key=user.key,
-                    media_id=media_id,
-                    rated=rated,
-                    watchlisted=watchlisted,
-                    entry_created=now_ts,
-                    entry_updated=now_ts,
-                    user=user
-                )
-                session.add(library_item)
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        values = select(
+            User.key,
+            literal(media_id),
+            literal(rated, Integer),
+            literal(watchlisted, Integer),
+            literal(now_ts),
+            literal(now_ts)
+        ).where(User.key == key) # no row for unknown users
+
+        stmt = sqlite_insert(UserLibrary).from_select(
+            ['user_key', 'media_id', 'rated', 'watchlisted', 'entry_created', 'entry_updated'],
+            values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserLibrary.user_key, UserLibrary.media_id],
+            set_={
+                'rated': func.coalesce(stmt.excluded.rated, UserLibrary.rated),
+                'watchlisted': func.coalesce(stmt.excluded.watchlisted, UserLibrary.watchlisted),
+                'entry_updated': stmt.excluded.entry_updated
+            })
 
+        with Session() as session:
+            session.execute(stmt)
             session.commit()
 
 
@@ -1646,9 +2812,13 @@ class DB():
             item = session.get(MediaItem, id)
 
             if item:
+                add_tombstones(session, 'library', select(UserLibrary.user_key, UserLibrary.media_id).where(UserLibrary.media_id == id))
                 session.query(UserLibrary).filter_by(media_id=id).delete(synchronize_session=False)
                 session.delete(item)
-                session.commit()            
+                session.flush() # the item must be gone before its search row is rewritten, or the INSERT ... SELECT brings it back
+                refresh_search_index(session, [id])
+                session.commit()
+                notify_library_change([id], deleted=True)            
 
 
     @staticmethod
@@ -1661,8 +2831,10 @@ class DB():
             item = session.get(VideoMetadata, id)
 
             if item:
+                media_id = item.media_id
                 session.delete(item)
-                session.commit()   
+                session.commit()
+                notify_library_change([media_id])
 
 
     @staticmethod
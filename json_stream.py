@@ -0,0 +1,105 @@
+from flask import Response, request, current_app, stream_with_context
+
+
+
+STREAM_CHUNK_BYTES = 64 * 1024 # serialized elements are sent in chunks of about this size
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+
+class Rows():
+    """
+    A field of document() whose elements are serialized one by one as they are pulled from `elements`
+    (usually a generator over a server side cursor), instead of being built as a list first.
+    """
+
+    def __init__(self, elements):
+        self.elements = elements
+
+
+
+def dumps(value) -> str:
+    # same settings as jsonify() outside of debug mode
+    return current_app.json.dumps(value, separators=(',', ':'))
+
+
+def array(elements):
+    """
+    JSON array of `elements`, one element at a time.
+    """
+    yield '['
+    separator = ''
+    for element in elements:
+        yield separator + dumps(element)
+        separator = ','
+    yield ']'
+
+
+def document(fields, ndjson: bool = False):
+    """
+    JSON object of the (name, value) pairs of `fields`, with Rows values streamed as arrays.
+    `fields` is read lazily, so values that depend on the rows streamed before them (e.g. a cursor) can
+    be yielded after them by a generator.
+
+    With `ndjson`, every element of a Rows field is a line {name: element} and every other field
+    a line {name: value}.
+    """
+    if ndjson:
+        for name, value in fields:
+            if isinstance(value, Rows):
+                for element in value.elements:
+                    yield dumps({name: element}) + '\n'
+            else:
+                yield dumps({name: value}) + '\n'
+        return
+
+    yield '{'
+    separator = ''
+    for name, value in fields:
+        yield f'{separator}{dumps(name)}:'
+        if isinstance(value, Rows):
+            yield from array(value.elements)
+        else:
+            yield dumps(value)
+        separator = ','
+    yield '}'
+
+
+def lines(elements):
+    """
+    NDJSON of `elements`, one line each.
+    """
+    for element in elements:
+        yield dumps(element) + '\n'
+
+
+def buffered(parts, size: int = STREAM_CHUNK_BYTES):
+    # joins the small strings of array() / document() into chunks of about `size` bytes
+    buffer, length = [], 0
+    for part in parts:
+        data = part.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def wants_ndjson() -> bool:
+    """
+    True if the request asks for NDJSON (?format=ndjson or Accept: application/x-ndjson).
+    """
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE], default='application/json') == NDJSON_MIMETYPE
+
+
+def stream_response(parts, ndjson: bool = False) -> Response:
+    """
+    Chunked response of the strings yielded by `parts` (array(), document(), lines()). The generator runs
+    with the request context, after the view returned, so cursors it reads from stay open until the last
+    row is sent and are closed when the client goes away (generator close).
+    """
+    return Response(stream_with_context(buffered(parts)), mimetype=NDJSON_MIMETYPE if ndjson else 'application/json')
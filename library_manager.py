@@ -17,8 +17,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-from database_utils import DB, insert_new, update_id, insert_video_file, delete_metadata_videos, insert_subtitles
+from database_utils import DB, insert_new_bulk, update_id, insert_video_files_bulk, delete_metadata_videos, insert_subtitles_bulk, update_content_keys
 from tmdb_client import TMDBClient
+from resource_governor import governor
 
 
 
@@ -28,6 +29,9 @@ VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".flv", ".wmv", ".webm") # u
 FFMPEG_STILLS_SAVE_DIR = 'static/images/stills/'
 HASH_KEY = (os.getenv('FILE_HASH_KEY') or 'd3f4ulT-CHANGE-THIS!!BACKUP_IF_NO_.EVN').encode('utf-8')
 AUTH_SIZE = 16
+CONTENT_SAMPLE_SIZE = 256 * 1024 # bytes read from the start, middle and end of a video for hash_content()
+VIDEO_BATCH_SIZE = 100 # processed videos inserted to database per transaction
+VIDEO_BATCH_SECONDS = 30 # max time a processed video waits for its batch (transcoded videos are inserted right away)
 
 if not os.getenv('FILE_HASH_KEY'):
     logger.warning(
@@ -46,7 +50,13 @@ def create_settings():
         'enable_tmdb_requests': True,               # Enable TMDb API requests
         'enable_tmdb_daily_updates': True,          # Enable automatic background updates (fetch fresh TMDb data every 24h)
         'enable_tmdb_optional_images': False,       # Include optional images like actor profile pictures (disabled by default)
-        'keep_original_video_files': False          # If True, original video files won't be deleted after transcoding
+        'keep_original_video_files': False,         # If True, original video files won't be deleted after transcoding
+        'background_nice': 10,                      # CPU niceness of ffmpeg/ffprobe (0 = normal priority, 19 = lowest)
+        'background_ionice_class': 3,               # I/O class of ffmpeg/ffprobe on linux (2 = best-effort, 3 = idle)
+        'scan_io_limit_mb': 50,                     # Max MB/s read by the library scanner, 0 = unlimited
+        'background_pause_active_streams': 2,       # Pause transcoding/extraction while this many videos are playing, 0 = never
+        'background_pause_read_latency_ms': 250,    # Pause transcoding/extraction while video read latency is above this, 0 = never
+        'background_max_pause_seconds': 1800        # Resume paused jobs after this long even if still busy
     }
 
     try:
@@ -306,6 +316,41 @@ def hash_str(str: str):
     return h.hexdigest()
 
 
+def hash_content(file_path: str, size: int = None):
+    """
+    Sampled content hash of a file: its size plus chunks from the start, middle and end.
+    Cheap compared to ffprobe / subtitle extraction, and copies of the same file hash the same regardless of path.
+    """
+    if size is None:
+        size = os.path.getsize(file_path)
+
+    h = hashlib.blake2b(key=HASH_KEY, digest_size=AUTH_SIZE)
+    h.update(str(size).encode('utf-8'))
+
+    offsets = {0, max(0, size // 2 - CONTENT_SAMPLE_SIZE // 2), max(0, size - CONTENT_SAMPLE_SIZE)}
+    with open(file_path, 'rb') as f:
+        for offset in sorted(offsets):
+            f.seek(offset)
+            chunk = f.read(CONTENT_SAMPLE_SIZE)
+            governor.throttle_io(len(chunk))
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_transcode_output(file_path: str, source_size: int, content_hash: str):
+    """
+    True if the stored `file_path` is not the source fingerprinted as (source_size, content_hash), i.e. ffmpeg
+    wrote it (transcode_to_mp4_264_aac() / reuse_transcoded_file()). None if it can't be told.
+    """
+    if not content_hash:
+        return None
+    try:
+        size = os.path.getsize(file_path)
+        return (size, hash_content(file_path, size)) != (source_size, content_hash)
+    except (OSError, TypeError):
+        return None
+
+
 def check_video_encoding(video_path):
         try:
             results = get_video_metadata(video_path)
@@ -341,7 +386,7 @@ def get_video_metadata(video_path):
         video_path
     ]
 
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    result = governor.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     metadata = json.loads(result.stdout.decode('utf-8'))
     
     # Extract general metadata
@@ -434,6 +479,15 @@ def norm_resolution(width: int, height: int):
         return f'{height}p' # Fallback for Unclassified
 
 
+def keep_original_video_files():
+    try:
+        settings = load_settings()
+        return bool(settings.get('keep_original_video_files'))
+    except Exception as e:
+        logger.warning(f'failed to settings "keep_original_video_files", defaulting to "False", error -> {e}', exc_info=True)
+        return False
+
+
 def remove_file_with_retry(file_path, retries=5, delay=5):
     for attempt in range(retries):
         try:
@@ -507,7 +561,7 @@ def transcode_to_mp4_264_aac(file_path: str):
 
     try:
         # Using subprocess.Popen to get real-time progress updates from stderr
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        process = governor.popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
 
         # Read stderr for progress info
         while True:
@@ -515,6 +569,8 @@ def transcode_to_mp4_264_aac(file_path: str):
             if stderr_line == '' and process.poll() is not None:
                 break  
 
+            governor.pause_process_if_busy(process, f'transcoding "{os.path.basename(file_path)}"')
+
             if stderr_line:
                 # Check for FFmpeg progress lines, shows: frame, time, fps, bitrate, etc.
                 if 'frame=' in stderr_line:
@@ -527,14 +583,35 @@ def transcode_to_mp4_264_aac(file_path: str):
         logger.error(f'transcoding file failed: {os.path.basename(file_path)}', exc_info=True)
         return file_path # returns original file path string
 
-    keep_original = False
+    if not keep_original_video_files():    
+        remove_file_with_retry(file_path)
+
+    return output_file
+
+
+def reuse_transcoded_file(transcoded_path: str, file_path: str):
+    """
+    Duplicate of an already transcoded video: hard link (or copy, if the file is on another drive)
+    the existing transcoded output next to `file_path` instead of running ffmpeg again.
+    Removes `file_path` afterwards, same as transcode_to_mp4_264_aac().
+
+    Returns new path string, or None if the output could not be created.
+    """
+    output_file = os.path.splitext(file_path)[0] + '.mp4'
+    if os.path.exists(output_file):
+        logger.debug(f'output file already exists: "{os.path.basename(output_file)}", cannot reuse transcoded file')
+        return None
+
     try:
-        settings = load_settings()
-        keep_original = settings.get('keep_original_video_files')
-    except Exception as e:
-        logger.warning(f'failed to settings "keep_original_video_files", defaulting to "False", error -> {e}', exc_info=True)
+        os.link(transcoded_path, output_file)
+    except OSError:
+        try:
+            shutil.copy2(transcoded_path, output_file)
+        except OSError:
+            logger.warning(f'failed to copy transcoded file {os.path.basename(transcoded_path)}', exc_info=True)
+            return None
 
-    if not keep_original:    
+    if not keep_original_video_files():
         remove_file_with_retry(file_path)
 
     return output_file
@@ -583,7 +660,7 @@ def ffmpeg_key_frame(video_path, hash_key, duration):
         output_path
     ]
     # 'scale=1280:720:force_original_aspect_ratio=increase, crop=iw*0.75:ih*0.75'
-    subprocess.run(
+    governor.run(
         cmd, 
         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
         encoding='utf-8', errors='replace'
@@ -595,7 +672,7 @@ def ffmpeg_key_frame(video_path, hash_key, duration):
         return None 
 
 
-def get_subtitles(path: str):
+def get_subtitles(path: str, extract=True):
         vtt_out = []
 
         vtt, srt = find_existing_subtitles(path)
@@ -611,7 +688,7 @@ def get_subtitles(path: str):
                 vtt_out.extend(norm)
                  
 
-        vtt_extracted = extract_subtitles(path)
+        vtt_extracted = extract_subtitles(path) if extract else []
         if vtt_extracted:
             norm = norm_sub_data(vtt_extracted)
             if norm:
@@ -669,6 +746,25 @@ def find_existing_subtitles(path: str) -> list[dict]:
         return vtt, srt                   
 
 
+def copy_extracted_subtitles(source_video: str, video_path: str):
+    """
+    Copy subtitles extracted for `source_video` (folder named after the video, see extract_subtitles())
+    into the matching folder of `video_path`, so a duplicate video doesn't need to extract them again.
+    """
+    source_folder = os.path.normpath(os.path.join(os.path.dirname(source_video), os.path.splitext(os.path.basename(source_video))[0]))
+    output_folder = os.path.normpath(os.path.join(os.path.dirname(video_path), os.path.splitext(os.path.basename(video_path))[0]))
+
+    if not os.path.isdir(source_folder) or os.path.normcase(source_folder) == os.path.normcase(output_folder):
+        return
+
+    os.makedirs(output_folder, exist_ok=True)
+    for file in os.listdir(source_folder):
+        output_path = os.path.join(output_folder, file)
+        if file.endswith(".vtt") and not os.path.exists(output_path):
+            governor.throttle_io(os.path.getsize(os.path.join(source_folder, file)))
+            shutil.copy2(os.path.join(source_folder, file), output_path)
+
+
 def convert_to_vtt(srt: list[dict]) -> list[dict]:
     vtt = []
     for subtitles in srt:
@@ -1010,7 +1106,7 @@ def extract_subtitles(video_path: str) -> list[dict]:
         '-of', 'json',
         video_path
     ]
-    result = subprocess.run(probe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    result = governor.run(probe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
 
     try:
         subtitles = json.loads(result.stdout).get("streams", [])
@@ -1043,7 +1139,7 @@ def extract_subtitles(video_path: str) -> list[dict]:
             '-y',                       # Overwrite if already exists
             output_path
         ]   
-        subprocess.run(extract_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        governor.run(extract_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
         
         if output_path:
             data = {
@@ -1092,33 +1188,43 @@ def insert_entry(existing_entries: list[str], catalog: dict[str, dict]):
     Insert new main entry tv series or movie to database.
 
     Params:
-        existing_entries (list): a list of hash keys from database
+        existing_entries (set): a set of hash keys from database
         catalog (dict[str, dict]): a dict with media catalogs { 'tv': tv_catalog, 'movies': movies_catalog }
 
     Returns:
         an updated list with the new entries of already existing (in database) hash keys
     """
+    new_entries = []
     for media_catalog in catalog.values(): # catalog = { 'tv': tv_catalog, 'movies': movies_catalog }
 
         for tv_movie_dict in media_catalog.values(): # tv_catalog = { 'tv_show_name': data } / movies_catalog = { 'movie_name': data }
             
             hash_key = tv_movie_dict.get('hash_key')
             if hash_key and hash_key not in existing_entries:
-                try:
-                    insert_new(tv_movie_dict)
-                except Exception:
-                    logger.error(f"failed to insert item with title '{tv_movie_dict.get('title', 'Unknown')}' and hash_key '{hash_key}' into database.", exc_info=True)
-                    continue
+                new_entries.append(tv_movie_dict)
+                existing_entries.add(hash_key) # same folder name in two libraries
+
+    if not new_entries:
+        return existing_entries
+
+    try:
+        insert_new_bulk(new_entries)
+    except Exception:
+        logger.error(f"failed to insert {len(new_entries)} new item(s) into database.", exc_info=True)
+    return existing_entries
 
 
-def identify_new_videos(existing_videos: set[str], catalog: dict[str, dict]) -> tuple[set, list[tuple[str, dict]]]:
+def identify_new_videos(existing_videos: set[str], catalog: dict[str, dict], existing_content: dict[tuple[int, str], str] = None) -> tuple[set, list[tuple[str, dict]]]:
     """
     Identify videos that are present locally but not yet recorded in the database.
 
+    New videos are also checked for duplicate content (see mark_duplicate_videos()).
+
     Args:
         existing_video_hashes (set[str]): Set of hash keys for videos already in the database.
         media_catalog (dict[str, dict]): Dictionary containing 'movies' and 'tv' catalogs, 
             each mapping media items to their data including video hashes.
+        existing_content (dict): { (source_size, content_hash): video hash_key } of videos already in the database.
 
     Returns:
         tuple: 
@@ -1153,22 +1259,89 @@ def identify_new_videos(existing_videos: set[str], catalog: dict[str, dict]) ->
                         all_local_video_hashes.add(hash_key)
                         if hash_key not in existing_videos:
                             new_videos.append((data.get('hash_key'), episode))
+
+    mark_duplicate_videos(new_videos, existing_content or {})
     return all_local_video_hashes, new_videos
 
 
+def mark_duplicate_videos(new_videos: list[tuple[str, dict]], existing_content: dict[tuple[int, str], str]):
+    """
+    Fingerprint new videos with their size + sampled content hash, and flag copies of a video
+    already in the database (or of one found earlier in the same scan).
+
+    Sets 'source_size' and 'content_hash' on every video_data, and 'duplicate_of' (hash key of the original video) on duplicates.
+    """
+    seen = dict(existing_content)
+    duplicates = 0
+
+    for _, video_data in new_videos:
+        video_path = video_data.get('file_path')
+        try:
+            size = os.path.getsize(video_path)
+            content_hash = hash_content(video_path, size)
+        except OSError:
+            logger.warning(f'failed to hash video content: {os.path.basename(video_path)}', exc_info=True)
+            continue
+
+        video_data['source_size'] = size
+        video_data['content_hash'] = content_hash
+
+        original = seen.get((size, content_hash))
+        if original:
+            video_data['duplicate_of'] = original
+            duplicates += 1
+            logger.debug(f'duplicate video found: "{os.path.basename(video_path)}" is a copy of video with hash_key "{original}"')
+        else:
+            seen[(size, content_hash)] = video_data.get('hash_key')
+
+    if duplicates:
+        logger.info(f'Found {duplicates} duplicate video(s), existing probe data, subtitles, stills and transcoded files will be reused.')
+
+
+def backfill_content_keys():
+    """
+    Fingerprint videos stored before duplicate detection, so new copies of them are found, and record whether
+    their stored file is a transcode. Rows without a fingerprint get the one of their stored file (a copy of it
+    can be reused as is), rows with one are compared with their stored file. Runs once per video.
+    """
+    videos = DB.fetch_videos_without_content_keys()
+    if not videos:
+        return
+
+    logger.info(f'Fingerprinting {len(videos)} video(s) stored before duplicate detection...')
+    updates = []
+    for video in videos:
+        if video.content_hash:
+            transcoded = is_transcode_output(video.file_path, video.source_size, video.content_hash)
+            if transcoded is not None:
+                updates.append({'id': video.id, 'transcoded': transcoded})
+            continue
+        try:
+            size = os.path.getsize(video.file_path)
+            content_hash = hash_content(video.file_path, size)
+        except OSError:
+            continue # missing files are removed from the database by the sync
+        updates.append({'id': video.id, 'source_size': size, 'content_hash': content_hash, 'transcoded': False})
+
+    update_content_keys(updates)
+    logger.debug(f'fingerprinted {len(updates)} of {len(videos)} video(s)')
+
+
 def process_and_insert_videos(videos: dict[str, list[tuple[str, dict]]]):
     """
     Process video files by inserting metadata for compatible files and transcoding
     incompatible files before inserting their metadata, including subtitles.
+    Duplicates reuse the metadata, subtitles, key frame and transcoded file of their original.
 
     Args:
-        videos (dict): Dictionary with keys 'compatible' and 'incompatible', each
+        videos (dict): Dictionary with keys 'compatible', 'incompatible' and 'duplicates', each
                        containing a list of (item_hash, video_data) tuples.
     """
     
     def extract_and_insert(item_hash, video_data, transcode=False):
         video_path = video_data.get('file_path')
         video_name = os.path.basename(video_path)
+        video_data['transcoded'] = False if video_data.get('content_hash') else None # unhashed videos are fingerprinted by backfill_content_keys()
         logger.debug(f'processing video: transcode="{transcode}", hash_key="{item_hash}", video="{video_name}"...')
 
         subtitles = get_subtitles(video_path)  # Extract subtitles before transcoding
@@ -1179,6 +1352,7 @@ def process_and_insert_videos(videos: dict[str, list[tuple[str, dict]]]):
             
             video_path = transcode_to_mp4_264_aac(video_path)
             video_data['file_path'] = video_path
+            video_data['transcoded'] = is_transcode_output(video_path, video_data.get('source_size'), video_data.get('content_hash'))
             
             end_time = time.perf_counter()
             duration = end_time - start_time
@@ -1207,29 +1381,103 @@ def process_and_insert_videos(videos: dict[str, list[tuple[str, dict]]]):
         video_data.update(extra_metadata)
         video_data['subtitles'] = subtitles if subtitles else []
 
-        item = DB.fetch_by_hash_key(item_hash)
-        if not item:
-            logger.warning(f'MediaItem not found in the database with hash_key: "{item_hash}"')
+        queue_insert(item_hash, video_data, flush=transcode) # the next transcode can take hours, don't hold this one back
+
+    def reuse_and_insert(item_hash, video_data):
+        video_path = video_data.get('file_path')
+        video_name = os.path.basename(video_path)
+
+        original = DB.fetch_video_by_hash(video_data.get('duplicate_of'))
+        if not original or not os.path.exists(original.file_path) or original.transcoded is None:
+            logger.debug(f'original of duplicate video "{video_name}" not available (or not known whether it was transcoded), processing it as a new video...')
+            extract_and_insert(item_hash, video_data, transcode=not check_video_encoding(video_path))
+            return
+        logger.debug(f'processing duplicate video: hash_key="{item_hash}", video="{video_name}", original video (ID: {original.id})...')
+
+        copy_extracted_subtitles(original.file_path, video_path)
+        subtitles = get_subtitles(video_path, extract=False)
+
+        video_data['transcoded'] = original.transcoded
+        if original.transcoded:
+            output_path = reuse_transcoded_file(original.file_path, video_path)
+            if not output_path:
+                extract_and_insert(item_hash, video_data, transcode=True)
+                return
+            video_path = output_path
+            video_data['file_path'] = video_path
+
+        video_data.update({
+            'size': os.path.getsize(video_path),
+            'resolution': original.resolution,
+            'duration': original.duration,
+            'audio_codec': original.audio_codec,
+            'video_codec': original.video_codec,
+            'bitrate': original.bitrate,
+            'frame_rate': original.frame_rate,
+            'width': original.width,
+            'height': original.height,
+            'aspect_ratio': original.aspect_ratio,
+            'key_frame': original.keyframe_path,
+            'extension': os.path.splitext(video_path)[1].replace(".", "")
+        })
+        video_data['subtitles'] = subtitles if subtitles else []
+
+        queue_insert(item_hash, video_data)
+
+    pending = [] # processed (item_hash, video_data) waiting to be inserted
+    last_flush = time.monotonic()
+
+    def queue_insert(item_hash, video_data, flush=False):
+        pending.append((item_hash, video_data))
+        if flush or len(pending) >= VIDEO_BATCH_SIZE or time.monotonic() - last_flush >= VIDEO_BATCH_SECONDS:
+            flush_pending()
+
+    def flush_pending():
+        nonlocal last_flush
+        last_flush = time.monotonic()
+        if not pending:
             return
-        
-        metadata_row_id = insert_video_file(item.id, video_data)
-        logger.debug(f'inserted video (ID: {metadata_row_id})')
 
-        if video_data.get('subtitles'):
-            insert_subtitles(metadata_row_id, video_data.get('subtitles'))
-            logger.debug(f'inserted {len(video_data["subtitles"])} subtitle(s) for video (ID: {metadata_row_id})')
+        item_ids = DB.fetch_ids_by_hash_keys({item_hash for item_hash, _ in pending})
+        videos_to_insert = []
+        for item_hash, video_data in pending:
+            if item_hash not in item_ids:
+                logger.warning(f'MediaItem not found in the database with hash_key: "{item_hash}"')
+                continue
+            videos_to_insert.append((item_ids[item_hash], video_data))
+
+        video_ids = insert_video_files_bulk(videos_to_insert)
+        logger.debug(f'inserted {len(video_ids)} video(s)')
+
+        subtitles = {video_ids[video_data.get('hash_key')]: video_data['subtitles'] for _, video_data in videos_to_insert
+                     if video_data.get('subtitles') and video_ids.get(video_data.get('hash_key'))}
+        if subtitles:
+            subtitle_ids = insert_subtitles_bulk(subtitles)
+            logger.debug(f'inserted {len(subtitle_ids)} subtitle(s) for {len(subtitles)} video(s)')
+
+        pending.clear()
     
     for encoding, videos in videos.items():
         if encoding == 'compatible':
             logger.info("Processing compatible files...")
             for item_hash, video_data in videos:
+                governor.wait_if_busy('video processing')
                 extract_and_insert(item_hash, video_data, transcode=False)
 
+        elif encoding == 'duplicates':
+            logger.info("Processing duplicate files...")
+            for item_hash, video_data in videos:
+                governor.wait_if_busy('video processing')
+                reuse_and_insert(item_hash, video_data)
+
         else:
             logger.info("Processing incompatible files... (this process might take a while)")
             for item_hash, video_data in videos:
+                governor.wait_if_busy('video transcoding')
                 extract_and_insert(item_hash, video_data, transcode=True)
 
+        flush_pending() # duplicates look up their originals in the database
+
 
 def request_and_udpdate_with_additional_data(catalog: dict[str, dict[str, dict]]):
     for media_catalog in catalog.values(): # catalog = { 'tv': tv_catalog, 'movies': movies_catalog }
@@ -1269,6 +1517,7 @@ def request_and_udpdate_with_additional_data(catalog: dict[str, dict[str, dict]]
 
 def sync_libraries():
     settings = load_settings()
+    governor.configure(settings)
     logger.info(f'Initializing library verification...')
     
 
@@ -1295,7 +1544,9 @@ def sync_libraries():
     logger.info('Scanning for video files not yet in the database...')
 
     existing_videos = set(DB.fetch_hash_VideoMetadata())
-    all_local_video_hashes, new_videos = identify_new_videos(existing_videos, catalog)
+    backfill_content_keys() # videos stored before duplicate detection
+    existing_content = DB.fetch_content_keys()
+    all_local_video_hashes, new_videos = identify_new_videos(existing_videos, catalog, existing_content)
 
 
 
@@ -1312,8 +1563,11 @@ def sync_libraries():
     logger.info(f"Checking HTML compatibility of new videos...")
     compatible_encoding = []
     incompatible_encoding = []
+    duplicates = []
     for item_hash, video_data in new_videos:
-        if check_video_encoding(video_data.get('file_path')):
+        if video_data.get('duplicate_of'):
+            duplicates.append((item_hash, video_data)) # same encoding as the original, no need to probe
+        elif check_video_encoding(video_data.get('file_path')):
             compatible_encoding.append((item_hash, video_data))
         else:
             incompatible_encoding.append((item_hash, video_data))
@@ -1321,7 +1575,8 @@ def sync_libraries():
     videos = dict()
     videos['compatible'] = compatible_encoding
     videos['incompatible'] = incompatible_encoding
-    logger.info(f"Processed {len(new_videos)} new videos: {len(compatible_encoding)} compatible with HTML5, {len(incompatible_encoding)} require transcoding.")
+    videos['duplicates'] = duplicates # processed last, after their originals
+    logger.info(f"Processed {len(new_videos)} new videos: {len(compatible_encoding)} compatible with HTML5, {len(incompatible_encoding)} require transcoding, {len(duplicates)} duplicate(s).")
 
 
 
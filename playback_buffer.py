@@ -0,0 +1,154 @@
+import time
+import atexit
+import threading
+from datetime import datetime, timezone
+from database_utils import DB
+import logging
+logger = logging.getLogger(__name__)
+
+
+
+FLUSH_INTERVAL = 5 # seconds between batched writes of buffered heartbeats
+
+
+
+class PlaybackBuffer():
+    """
+    Write-behind buffer for watch-progress heartbeats (/accounts/v1/w).
+
+    Heartbeats are coalesced per (user key, video id): the latest position / watched state wins and
+    seconds played add up. A background thread writes everything buffered in one transaction every
+    FLUSH_INTERVAL seconds (and at exit). Reads overlay buffered values (see get() / overlay()),
+    so clients never see the delay.
+    """
+
+    def __init__(self, write, interval: float = FLUSH_INTERVAL):
+        self._write = write # callable([(user key, data), ...]) -> None, e.g. DB.set_user_playback_bulk
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {} # { (user key, video id): entry }
+        self._writing = {} # entries of the flush in progress, still visible to reads until committed
+        self._stop = threading.Event()
+        self._thread = None
+
+
+    def add(self, key: str, data: dict):
+        """
+        Buffer a heartbeat, `data` as accepted by DB.set_user_playback().
+        """
+        entry_key = (key, data['video_id'])
+        with self._lock:
+            entry = self._pending.get(entry_key)
+            seconds_played = data.get('seconds_played', 0) + (entry['seconds_played'] if entry else 0)
+            self._pending[entry_key] = {
+                **data,
+                'seconds_played': seconds_played,
+                'entry_updated': int(datetime.now(timezone.utc).timestamp())
+            }
+        self._start()
+
+
+    def get(self, key: str, video_id: int):
+        """
+        Buffered (not yet written) values of a user's video, or None.
+        """
+        with self._lock:
+            entry = self._pending.get((key, video_id)) or self._writing.get((key, video_id))
+            return dict(entry) if entry else None
+
+
+    def pending(self, key: str, media_id: int = None) -> dict[int, dict]:
+        """
+        The user's buffered values by video id, as playback dicts of the API
+        (media_id, video_id, watched, paused_at, duration, entry_updated).
+        """
+        with self._lock:
+            buffered = {**self._writing, **self._pending}
+            entries = [dict(e) for (k, _), e in buffered.items() if k == key and (media_id is None or e['media_id'] == media_id)]
+        return {entry['video_id']: {
+            'media_id': entry['media_id'],
+            'video_id': entry['video_id'],
+            'watched': entry.get('watched', False),
+            'paused_at': entry.get('video_paused_at', 0),
+            'duration': entry.get('video_duration', 0),
+            'entry_updated': entry['entry_updated']
+        } for entry in entries}
+
+
+    def overlay(self, key: str, videos: list[dict], media_id: int = None):
+        """
+        Apply the user's buffered values to `videos` (dicts with a 'video_id', as returned by the API)
+        and append buffered videos that are not in the list yet. Only keys used in `videos` are set.
+        """
+        entries = self.pending(key, media_id)
+        if not entries:
+            return videos
+
+        fields = set(videos[0]) if videos else {'media_id', 'video_id', 'watched', 'paused_at', 'duration', 'entry_updated'}
+        by_video = {v.get('video_id'): v for v in videos}
+        for video_id, values in entries.items():
+            video = by_video.get(video_id)
+            if video is None:
+                video = {}
+                videos.append(video)
+            video.update({k: v for k, v in values.items() if k in fields})
+        return videos
+
+
+    def flush(self):
+        """
+        Write everything buffered in one transaction. On failure the entries are put back (merged with
+        heartbeats that arrived in the meantime) and retried on the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._writing = pending
+            if not pending:
+                return
+
+            start = time.perf_counter()
+            try:
+                self._write(list((key, entry) for (key, _), entry in pending.items()))
+            except Exception as e:
+                logger.error(f'failed to write {len(pending)} buffered playback update(s), retrying later. error -> {e}', exc_info=True)
+                with self._lock:
+                    self._writing = {}
+                    for entry_key, entry in pending.items():
+                        newer = self._pending.get(entry_key)
+                        if newer:
+                            newer['seconds_played'] += entry['seconds_played']
+                        else:
+                            self._pending[entry_key] = entry
+                return
+            with self._lock:
+                self._writing = {}
+            logger.debug(f'wrote {len(pending)} buffered playback update(s) in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self._interval + 30)
+        self.flush()
+
+
+    def _start(self):
+        if self._thread:
+            return
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name='playback-buffer', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.flush()
+
+
+
+playback_buffer = PlaybackBuffer(DB.set_user_playback_bulk)
@@ -0,0 +1,237 @@
+import os
+import sys
+import time
+import shutil
+import signal
+import threading
+import subprocess
+import logging
+logger = logging.getLogger(__name__)
+
+
+
+DEFAULTS = {
+    'background_nice': 10,                          # CPU niceness of ffmpeg/ffprobe children (0 = normal, 19 = lowest)
+    'background_ionice_class': 3,                   # I/O class of ffmpeg/ffprobe children (2 = best-effort, 3 = idle), linux only
+    'scan_io_limit_mb': 50,                         # Max MB/s read by the scanner (content hashing, subtitle copies), 0 = unlimited
+    'background_pause_active_streams': 2,           # Pause background jobs while this many streams (or more) are playing, 0 = never
+    'background_pause_read_latency_ms': 250,        # Pause background jobs while /play file reads take longer than this, 0 = never
+    'background_max_pause_seconds': 1800,           # Resume background jobs after this long, even if still busy
+}
+STREAM_ACTIVE_WINDOW = 30 # seconds since the last /play request for a stream to count as active
+LATENCY_SMOOTHING = 0.2 # weight of the newest sample in the read latency moving average
+READ_REPORT_INTERVAL = 1 # seconds between read latency samples of a streamed video
+BUSY_POLL_INTERVAL = 2
+
+
+
+class ResourceGovernor:
+    """
+    Keeps background work (library scans, ffmpeg/ffprobe jobs) from starving live streams.
+
+    - ffmpeg/ffprobe children run with a lower CPU and I/O priority (see run() / popen()).
+    - scanner reads are rate limited (see throttle_io()).
+    - background jobs wait (see wait_if_busy()), and running ffmpeg jobs are suspended on posix, while
+      the number of active streams or the /play read latency is above the configured thresholds.
+    """
+
+    def __init__(self, settings: dict = None):
+        self._lock = threading.Lock()
+        self._streams = {} # { stream key: last seen (monotonic) }
+        self._read_latency = 0.0
+        self._io_allowance = 0.0
+        self._io_checked = time.monotonic()
+        self._resumed = {} # { pid: when a suspended child was resumed (monotonic) }
+        self._timed_out = None # when a wait_if_busy() last gave up while still busy (monotonic)
+        self.configure(settings)
+
+
+    def configure(self, settings: dict = None):
+        settings = settings or {}
+        self.settings = {key: settings.get(key, default) for key, default in DEFAULTS.items()}
+
+
+    # -- streams
+
+    def note_stream(self, stream_key: str, read_latency: float = None):
+        """
+        Called on every /play request and while its body is sent. `read_latency` (seconds) is the mean time
+        of the file reads of the response, see timed_reads().
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._streams[stream_key] = now
+            if read_latency is not None:
+                self._read_latency += (read_latency - self._read_latency) * LATENCY_SMOOTHING
+
+
+    def timed_reads(self, stream_key: str, chunks):
+        """
+        Iterate a file response's `chunks` (response.response of send_file()), sampling how long the reads
+        take for note_stream() about every READ_REPORT_INTERVAL seconds and once at the end. The time the
+        server spends sending a chunk to the client is not counted.
+        """
+        iterator = iter(chunks)
+        reads, spent, reported = 0, 0.0, time.monotonic()
+        try:
+            while True:
+                start = time.perf_counter()
+                chunk = next(iterator, None)
+                if chunk is None:
+                    break
+                spent += time.perf_counter() - start
+                reads += 1
+                if time.monotonic() - reported >= READ_REPORT_INTERVAL:
+                    self.note_stream(stream_key, read_latency=spent / reads)
+                    reads, spent, reported = 0, 0.0, time.monotonic()
+                yield chunk
+        finally:
+            if reads:
+                self.note_stream(stream_key, read_latency=spent / reads)
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+
+    def active_streams(self):
+        cutoff = time.monotonic() - STREAM_ACTIVE_WINDOW
+        with self._lock:
+            for key in [k for k, seen in self._streams.items() if seen < cutoff]:
+                del self._streams[key]
+            return len(self._streams)
+
+
+    def read_latency_ms(self):
+        if not self.active_streams():
+            return 0.0
+        return self._read_latency * 1000
+
+
+    def is_busy(self):
+        max_streams = self.settings['background_pause_active_streams']
+        max_latency = self.settings['background_pause_read_latency_ms']
+
+        if max_streams and self.active_streams() >= max_streams:
+            return True
+        if max_latency and self.read_latency_ms() > max_latency:
+            return True
+        return False
+
+
+    def wait_if_busy(self, job: str = 'background job'):
+        """
+        Block the calling (background) thread while streams are busy, up to 'background_max_pause_seconds'.
+        After a wait that ran out while still busy, background jobs run at least as long again before the
+        next wait, so a sync keeps making progress while streams stay busy.
+        """
+        max_pause = self.settings['background_max_pause_seconds']
+        with self._lock:
+            timed_out = self._timed_out
+        if timed_out is not None and time.monotonic() - timed_out < max_pause:
+            return
+        if not self.is_busy():
+            return
+
+        logger.info(f'pausing {job}: {self.active_streams()} active stream(s), read latency {self.read_latency_ms():.0f} ms')
+        deadline = time.monotonic() + max_pause
+        while self.is_busy() and time.monotonic() < deadline:
+            time.sleep(BUSY_POLL_INTERVAL)
+        if self.is_busy():
+            with self._lock:
+                self._timed_out = time.monotonic()
+            logger.info(f'resuming {job} after {max_pause}s while still busy')
+        else:
+            logger.info(f'resuming {job}')
+
+
+    def pause_process_if_busy(self, process: subprocess.Popen, job: str = 'background job'):
+        """
+        Suspend a running child process while streams are busy (posix only, on windows the lowered priority has to do).
+        A child resumed after 'background_max_pause_seconds' runs at least as long again before it is suspended
+        again, so a job keeps making progress while streams stay busy.
+        """
+        if os.name != 'posix':
+            return
+        if process.poll() is not None:
+            with self._lock:
+                self._resumed.pop(process.pid, None)
+            return
+
+        with self._lock:
+            resumed = self._resumed.get(process.pid)
+        if resumed is not None and time.monotonic() - resumed < self.settings['background_max_pause_seconds']:
+            return
+        if not self.is_busy():
+            return
+
+        try:
+            process.send_signal(signal.SIGSTOP)
+        except OSError:
+            return
+        try:
+            self.wait_if_busy(job)
+        finally:
+            process.send_signal(signal.SIGCONT)
+            with self._lock:
+                self._resumed[process.pid] = time.monotonic()
+
+
+    # -- scanner I/O
+
+    def throttle_io(self, nbytes: int):
+        """
+        Account for `nbytes` read by the scanner and sleep long enough to stay under 'scan_io_limit_mb'.
+        """
+        limit = self.settings['scan_io_limit_mb'] * 1024 * 1024
+        if not limit:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._io_allowance = min(limit, self._io_allowance + (now - self._io_checked) * limit)
+            self._io_checked = now
+            self._io_allowance -= nbytes
+            delay = -self._io_allowance / limit if self._io_allowance < 0 else 0
+
+        if delay:
+            time.sleep(delay)
+
+
+    # -- child processes
+
+    def command(self, cmd: list[str]):
+        """
+        Prefix `cmd` with nice (posix) and ionice (linux) when available. The priority is set by these
+        wrappers rather than a preexec_fn, which is not safe to use while other threads are running.
+        """
+        cmd = list(cmd)
+        ionice_class = self.settings['background_ionice_class']
+        if ionice_class and sys.platform.startswith('linux') and shutil.which('ionice'):
+            cmd = ['ionice', '-c', str(ionice_class)] + cmd
+        nice = self.settings['background_nice']
+        if nice and os.name == 'posix' and shutil.which('nice'):
+            cmd = ['nice', '-n', str(nice)] + cmd
+        return cmd
+
+
+    def popen_kwargs(self):
+        """
+        subprocess kwargs that lower the CPU and I/O priority of the child on windows (see command() for posix).
+        """
+        nice = self.settings['background_nice']
+        if not nice or os.name != 'nt':
+            return {}
+
+        idle = nice >= 15 or self.settings['background_ionice_class'] == 3
+        return {'creationflags': subprocess.IDLE_PRIORITY_CLASS if idle else subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+
+
+    def run(self, cmd: list[str], **kwargs):
+        return subprocess.run(self.command(cmd), **self.popen_kwargs(), **kwargs)
+
+
+    def popen(self, cmd: list[str], **kwargs):
+        return subprocess.Popen(self.command(cmd), **self.popen_kwargs(), **kwargs)
+
+
+
+governor = ResourceGovernor()
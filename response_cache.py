@@ -0,0 +1,189 @@
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import request, Response
+import logging
+logger = logging.getLogger(__name__)
+
+
+
+RESPONSE_CACHE_MB = 64 # memory cap of cached response bodies, least recently used ones are evicted first
+ENTRY_OVERHEAD = 512 # bytes counted per entry on top of its body and key (dict slots, headers, ...)
+CACHE_CONTROL = 'private, no-cache' # browsers keep the body, but revalidate it with If-None-Match every time
+CACHED_HEADERS = ('X-Next-Cursor',) # response headers stored with the body
+
+
+
+class ResponseCache():
+    """
+    In-process cache of GET responses that only change when the library does (/content/v1/*).
+
+    Entries are keyed by path and query arguments. Entries tagged with a media id are dropped when
+    that item changes, untagged ones (lists, search, ...) on every library change. A generation
+    counter, bumped by invalidate(), keeps responses built from data older than the last write
+    from being stored. Bodies are kept in LRU order within `max_bytes`, with their ETag (see conditional()),
+    so revalidations of cached responses are answered without touching the database.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MB * 1024 * 1024):
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # { key: (body, status, mimetype, etag, headers, tag, size) }
+        self._size = 0
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+
+    def cached(self, tag: str = None, vary=None):
+        """
+        Decorator for a route. `tag` names the view argument holding the media id the response belongs to,
+        `vary()` returns anything else besides the library the response depends on (e.g. today's date).
+        Only 200 responses are stored.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                key = (request.path, tuple(sorted(request.args.items(multi=True))), vary() if vary else None)
+                entry = self._get(key)
+                if entry:
+                    body, status, mimetype, etag, headers = entry
+                    matched = etag_matches(etag) if etag else None
+                    if matched:
+                        response = not_modified(matched)
+                    else:
+                        response = Response(body, status=status, mimetype=mimetype, headers=headers)
+                        if etag:
+                            response.set_etag(etag)
+                            response.headers['Cache-Control'] = CACHE_CONTROL
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                generation = self._generation
+                response = f(*args, **kwargs)
+                if isinstance(response, Response) and response.status_code == 200 and not response.is_streamed:
+                    self._put(key, response, kwargs.get(tag) if tag else None, generation)
+                    response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated_function
+        return decorator
+
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[:5]
+
+
+    def _put(self, key, response: Response, tag, generation: int):
+        body = response.get_data()
+        size = len(body) + len(key[0]) + ENTRY_OVERHEAD
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            if generation != self._generation: # the library changed while the response was built
+                return
+            old = self._entries.pop(key, None)
+            if old:
+                self._size -= old[6]
+            etag, _ = response.get_etag()
+            headers = [(name, response.headers[name]) for name in CACHED_HEADERS if name in response.headers]
+            self._entries[key] = (body, response.status_code, response.mimetype, etag, headers, tag, size)
+            self._size += size
+            while self._size > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted[6]
+                self._evictions += 1
+
+
+    def invalidate(self, media_ids: list[int] = None):
+        """
+        Drop untagged entries and entries of `media_ids` (everything without `media_ids`).
+        """
+        ids = set(media_ids or [])
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items() if media_ids is None or entry[5] is None or entry[5] in ids]
+            for key in stale:
+                self._size -= self._entries.pop(key)[6]
+        logger.debug(f'response cache: dropped {len(stale)} entries (generation {self._generation})')
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self._max_bytes,
+                'generation': self._generation,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else None,
+                'evictions': self._evictions
+            }
+
+
+
+def etag_matches(etag: str) -> str | None:
+    """
+    The tag of the request's If-None-Match that matches `etag`, also in its compressed variants
+    ("<etag>-gzip", "<etag>-br", see compression.compress_response()), or None.
+    """
+    for tag in request.if_none_match.as_set():
+        if tag == etag or tag.startswith(f'{etag}-'):
+            return tag
+    return None
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add('Accept-Encoding') # same as the 200 it stands for, see compress_response()
+    return response
+
+
+def conditional(version, arg: str = None, vary=None):
+    """
+    Decorator for a route: sets a strong ETag built from `version(kwargs[arg])` (a tuple of timestamps,
+    e.g. DB.fetch_item_version) and `vary()` (see ResponseCache.cached()), and answers a matching
+    If-None-Match with 304 without running the route.
+    Routes whose version is None (not found) or fails to load run as usual, without an ETag.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                current = version(kwargs[arg]) if arg else version()
+            except Exception as e:
+                logger.warning(f'failed to load the version of {request.path}, error -> {e}', exc_info=True)
+                current = None
+            if current is None:
+                return f(*args, **kwargs)
+
+            validator = repr((request.path, sorted(request.args.items(multi=True)), current, vary() if vary else None))
+            etag = hashlib.sha1(validator.encode()).hexdigest()[:20]
+            matched = etag_matches(etag)
+            if matched:
+                return not_modified(matched)
+
+            response = f(*args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+        return decorated_function
+    return decorator
+
+
+
+response_cache = ResponseCache()
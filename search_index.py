@@ -0,0 +1,171 @@
+import re
+import math
+import threading
+import unicodedata
+from itertools import chain
+from collections import Counter, defaultdict
+import logging
+logger = logging.getLogger(__name__)
+
+
+
+MIN_SIMILARITY = 0.4 # share of the query's trigrams a term must contain to be suggested
+PREFIX_BONUS = 0.5 # added when a word of the term starts with the query
+TITLE_BONUS = 0.1 # titles rank above original titles and cast names with the same score
+MAX_CANDIDATES = 200 # terms scored per query, the ones sharing the most trigrams
+
+
+
+def normalize(text: str) -> str:
+    """
+    'Amélie (2001)' -> 'amelie 2001'
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def trigrams(text: str, partial: bool = False) -> set[str]:
+    """
+    Trigrams of every word, padded with a space in front (and at the end, unless `partial`: the last
+    word of a query may still be being typed).
+    """
+    words = text.split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = f' {word}' if partial and i == len(words) - 1 else f' {word} '
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+
+class TrigramIndex():
+    """
+    In-memory trigram index of titles, original titles and cast names for typo tolerant autocomplete.
+
+    Every term ("Andor", "Diego Luna", ...) points to a media item. A query is scored against the terms
+    sharing at least one of its trigrams, so "andro" still finds "Andor", and nothing touches SQLite.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+
+    def _clear(self):
+        self._items = {} # { media id: {'title', 'media_type', 'terms': [term ids]} }
+        self._terms = {} # { term id: (media id, kind, normalized text, trigram count) }
+        self._postings = defaultdict(set) # { trigram: {term ids} }
+        self._next_term = 0
+
+
+    def __len__(self):
+        return len(self._items)
+
+
+    def build(self, entries: dict[int, dict]):
+        """
+        Replace the index. `entries` is { media id: {'title', 'media_type', 'terms': [other names]} }.
+        """
+        with self._lock:
+            self._clear()
+            for media_id, entry in entries.items():
+                self._add(media_id, entry)
+        logger.info(f'autocomplete index built: {len(self._items)} item(s), {len(self._terms)} term(s)')
+
+
+    def update(self, entries: dict[int, dict]):
+        with self._lock:
+            for media_id, entry in entries.items():
+                self._remove(media_id)
+                self._add(media_id, entry)
+
+
+    def remove(self, media_ids: list[int]):
+        with self._lock:
+            for media_id in media_ids:
+                self._remove(media_id)
+
+
+    def _add(self, media_id: int, entry: dict):
+        title = entry.get('title')
+        terms = [('title', title)] + [('term', t) for t in entry.get('terms', []) if t and t != title]
+
+        term_ids = []
+        for kind, text in terms:
+            text = normalize(text)
+            grams = trigrams(text)
+            if not grams:
+                continue
+
+            term_id = self._next_term
+            self._next_term += 1
+            self._terms[term_id] = (media_id, kind, text, len(grams))
+            for gram in grams:
+                self._postings[gram].add(term_id)
+            term_ids.append(term_id)
+
+        self._items[media_id] = {'title': title, 'media_type': entry.get('media_type'), 'terms': term_ids}
+
+
+    def _remove(self, media_id: int):
+        item = self._items.pop(media_id, None)
+        if not item:
+            return
+
+        for term_id in item['terms']:
+            _, _, text, _ = self._terms.pop(term_id)
+            for gram in trigrams(text):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(term_id)
+                    if not postings:
+                        del self._postings[gram]
+
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Ranked matches for `query`: [{'id', 'title', 'media_type', 'match', 'score'}], best first.
+        """
+        query = normalize(query)
+        grams = trigrams(query, partial=True)
+        if not grams:
+            return []
+
+        with self._lock:
+            # a term sharing `min_shared` of the query's trigrams has at least one of the rarest
+            # len - min_shared + 1 of them, so only those postings are scanned for candidates
+            postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+            min_shared = max(1, math.ceil(len(grams) * MIN_SIMILARITY))
+            rare, common = postings[:len(postings) - min_shared + 1], postings[len(postings) - min_shared + 1:]
+
+            shared = Counter(chain.from_iterable(rare))
+            for term_id in shared:
+                shared[term_id] += sum(term_id in p for p in common)
+            candidates = [(term_id, count) for term_id, count in shared.most_common(MAX_CANDIDATES) if count >= min_shared]
+
+            best = {} # { media id: (score, term text) }
+            for term_id, count in candidates:
+                media_id, kind, text, term_grams = self._terms[term_id]
+                similarity = count / len(grams)
+                score = similarity + count / term_grams * 0.1 # prefer short terms, "Andor" over "Andor and the ..."
+                if text.startswith(query) or f' {query}' in f' {text}':
+                    score += PREFIX_BONUS
+                if kind == 'title':
+                    score += TITLE_BONUS
+
+                if score > best.get(media_id, (0, None))[0]:
+                    best[media_id] = (score, text)
+
+            ranked = sorted(best.items(), key=lambda x: x[1][0], reverse=True)[:limit]
+            return [{
+                'id': media_id,
+                'title': self._items[media_id]['title'],
+                'media_type': self._items[media_id]['media_type'],
+                'match': text,
+                'score': round(score, 3)
+            } for media_id, (score, text) in ranked]
+
+
+
+autocomplete_index = TrigramIndex()
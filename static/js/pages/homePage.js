@@ -1,8 +1,8 @@
 import { apiFetch } from '../api/_api.js';
 
-function renderCatalog(data, element) { 
+function renderCatalog(data, element, append = false) { 
     const container = document.getElementById(element);
-    container.innerHTML = ''; 
+    if (!append) container.innerHTML = ''; 
     data.forEach(item => {
         const title = item.original_name || item.title || 'Untitled';
         const posterPath = item.poster_path
@@ -26,29 +26,35 @@ function renderCatalog(data, element) {
     });
 }
 
-async function fetchCatalog() {
-    const res = await apiFetch('/content/v1/catalog'); 
-    const data = await res.json();
-
-    renderCatalog(data, 'new-carousel');
-}
-
-async function fetchTv() {
-    const res = await apiFetch('/content/v1/tv');  
-    const data = await res.json();
-
-    renderCatalog(data, 'tv-carousel');
-}
-
-async function fetchMovies() {
-    const res = await apiFetch('/content/v1/movies'); 
-    const data = await res.json();
-
-    renderCatalog(data, 'movie-carousel');
+function loadCatalog(url, element) {
+    // first page now, the next one (X-Next-Cursor) whenever the carousel is scrolled near its end
+    const container = document.getElementById(element);
+    let cursor = null;
+    let loaded = false;
+    let loading = false;
+
+    async function nextPage() {
+        if (loading || (loaded && !cursor)) return;
+        loading = true;
+        try {
+            const res = await apiFetch(cursor ? `${url}?cursor=${encodeURIComponent(cursor)}` : url);
+            const data = await res.json();
+            renderCatalog(data, element, loaded);
+            cursor = res.headers.get('X-Next-Cursor');
+            loaded = true;
+        } finally {
+            loading = false;
+        }
+    }
+
+    container.addEventListener('scroll', () => {
+        if (container.scrollLeft + 2 * container.clientWidth >= container.scrollWidth) nextPage();
+    });
+    return nextPage();
 }
 
 document.addEventListener('DOMContentLoaded', async () => {
-    fetchCatalog();
-    fetchTv();
-    fetchMovies();
+    loadCatalog('/content/v1/catalog', 'new-carousel');
+    loadCatalog('/content/v1/tv', 'tv-carousel');
+    loadCatalog('/content/v1/movies', 'movie-carousel');
 });
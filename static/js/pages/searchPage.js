@@ -40,6 +40,7 @@ function searchFunction() {
                         });
                     } else {
                         resultsContainer.innerHTML = `<p>No results found for "${query}"</p>`;
+                        showSuggestions(query, resultsContainer);
                     }
                 })
                 .catch(error => console.error('Error fetching search results:', error));
@@ -49,6 +50,30 @@ function searchFunction() {
     }, 500);
 }
 
+function showSuggestions(query, resultsContainer) {
+    // typo tolerant matches ("andro" -> "Andor") when the search itself found nothing
+    apiFetch('content/v1/autocomplete?limit=5&query=' + encodeURIComponent(query))
+        .then(response => response.json())
+        .then(data => {
+            if (!data.results || data.results.length === 0) return;
+
+            const suggestions = document.createElement('p');
+            suggestions.className = 'search-suggestions';
+            suggestions.textContent = 'Did you mean: ';
+
+            data.results.forEach((result, i) => {
+                const link = document.createElement('a');
+                link.href = result.id;
+                link.textContent = result.title;
+                suggestions.appendChild(link);
+                if (i < data.results.length - 1) suggestions.append(', ');
+            });
+
+            resultsContainer.appendChild(suggestions);
+        })
+        .catch(error => console.error('Error fetching suggestions:', error));
+}
+
 document.addEventListener("DOMContentLoaded", () => {
     const searchInput = document.getElementById("search-item");
     if (searchInput) {
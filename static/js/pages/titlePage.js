@@ -227,21 +227,9 @@ class PageLoader {
 
     async load() {
         try {
-            const [itemRes, ratingsRes, networksRes, videosRes, accountRes] = await Promise.all([
-            apiFetch(`/content/v1/item/${this.id}`),
-            apiFetch(`/content/v1/item/${this.id}/ratings`),
-            apiFetch(`/content/v1/item/${this.id}/networks`),
-            apiFetch(`/content/v1/item/${this.id}/videos`),
-            apiFetch('/accounts/v1/l/a')
-            ]);
-
-            const [item, ratings, networks, videos, account] = await Promise.all([
-            itemRes.json(),
-            ratingsRes.json(),
-            networksRes.json(),
-            videosRes.json(),
-            accountRes.json()
-            ]);
+            // item, ratings, networks and videos merged with the user's progress, in one request
+            const res = await apiFetch(`/content/v1/item/${this.id}/page`);
+            const { item, ratings, networks, videos } = await res.json();
 
             // if (videos.error) {
             //     window.location.href = '/404';
@@ -264,17 +252,11 @@ class PageLoader {
 
 
 
-            const accountMap = new Map(account.videos.map(v => [v.video_id, v]));
-            const mergedVideos = videos.map(video => {
-            const match = accountMap.get(video.id);
-            if (match) {
-                return { ...video, ...match };
-            }
-            return video;
-            });
             next_ep(item.next_episode)
             // Load videos into UI
-            loadVideos(this.id, mergedVideos, item.original_title || item.title || 'Untitled', item);
+            if (videos.length) {
+                loadVideos(this.id, videos, item.original_title || item.title || 'Untitled', item);
+            }
         } catch (err) {
             console.error('Error loading media item:', err);
             // window.location.href = '/404';
@@ -48,7 +48,7 @@ class VideoElement {
         }
         const track = document.createElement('track');
 
-        track.src = `/subs?s=${sub.hash_key}`;
+        track.src = sub.src;
         track.kind = sub.kind || 'subtitles';
         track.srclang = sub.lang;
         track.label = sub.label;
@@ -88,8 +88,8 @@ class PageDetails {
     }
 
     async updatePage(item, video, mediaId) {
-        const season = video?.season_number ?? video?.metadata.season_number;
-        const episode = video?.episode_number ?? video?.metadata.episode_number;
+        const season = video?.season_number;
+        const episode = video?.episode_number;
         
         const pageT = season != null
             ? `Season ${season} Episode ${episode}${video?.name ? " - " + video.name : ""}`
@@ -108,8 +108,8 @@ class PageDetails {
         }
 
         if (this.mediaEpisodeEl) {
-            const season = video?.season_number ?? video?.metadata.season_number;
-            const episode = video?.episode_number ?? video?.metadata.episode_number;
+            const season = video?.season_number;
+            const episode = video?.episode_number;
         
             if (season != null) {
                 this.mediaEpisodeEl.textContent = `S${season} E${episode}${video?.name ? " - " + video.name : ""}`;
@@ -140,60 +140,55 @@ class VideoPageLoader {
     }
 
     async load() {
-        const [item, nextVideos, video, account] = await Promise.all([
-            apiFetch(`/content/v1/item/${this.id}`).then(res => res.json()),
-            apiFetch(`/content/v1/item/${this.id}/videos`).then(res => res.json()),
-            apiFetch(`/content/v1/video/${this.videoId}`).then(res => res.json()),
-            apiFetch(`/accounts/v1/p?v=${this.videoId}`).then(res => res.json())
-        ]);
-        
-        const still = account.video_start_time <= 0? video.still_path || video.metadata.key_frame : null;
+        // stream, subtitles, resume position, episode and its neighbours in one request
+        const res = await apiFetch(`/content/v1/video/${this.videoId}/start`);
+        const start = await res.json();
+        const video = { ...start.episode, ...start };
+        const startTime = start.resume.video_start_time;
+
+        const still = startTime <= 0 ? video.still_path || video.key_frame : null;
         // async - Insert Video Source
         this.video.insertVideo({
-            videoSrc: `/play?v=${video.hash_key}`,
+            videoSrc: start.stream_url,
             previewImg: still,
             videoId: this.videoId,
             itemId: this.id,
-            startTime: account.video_start_time,
+            startTime: startTime,
             duration: video.duration
         });
 
         // async - Update UI
-        this.page.updatePage(item, video, this.id);
+        this.page.updatePage(start.item || {}, video, this.id);
 
         // await all - Insert Subtitles Tracks
-        const subs = video.subtitles
+        const subs = start.subtitles
         if (Array.isArray(subs) && subs.length > 0) {
             await Promise.all(subs.map(sub => this.video.insertSubtitles(sub)));
         }
 
-        addNextVideoButton(this.id, video, nextVideos)
+        addNextVideoButton(this.id, video, start.next)
 
         // Init videojs()
         const player = this.video.initVideoJS();
 
         // load scripts videojs dependant
         captionPreference(player);
-        setTime(player, account.video_start_time);
+        setTime(player, startTime);
         trackTime(player, this.id, this.videoId);
         return player
     }
 }
 
 
-async function addNextVideoButton(media_id, video, nextVideos) {
+async function addNextVideoButton(media_id, video, nextEpisode) {
     const container = document.querySelector('.video-data-container');
     if (!container) return;
 
-    // Find next episode
-    const currentEpisodeNumber = video.metadata.episode_number;
-    const nextEpisode = nextVideos.find(v => v.metadata.episode_number === currentEpisodeNumber + 1);
-
     if (!nextEpisode) return; // No next episode
 
     // Create button
     const btn = document.createElement('button');
-    btn.textContent = `Next Episode: E${nextEpisode.episode_number || nextEpisode.metadata.episode_number} - ${nextEpisode.name || ''}`;
+    btn.textContent = `Next Episode: ${nextEpisode.season_number !== video.season_number ? `S${nextEpisode.season_number} ` : ''}E${nextEpisode.episode_number} - ${nextEpisode.name || ''}`;
     btn.style.cursor = 'pointer';
     btn.style.padding = '1rem 2rem';
     btn.style.fontSize = '2.2rem';
@@ -45,10 +45,10 @@ async function renderHeroCards(data, elementId) {
 
     data.forEach((item, index) => {
         const title = item.name || 'Untitled';
-        const SeasonEp = item.season_number ? `S${item.season_number}: Episode ${item.episode_number || 0}` : null;
+        const SeasonEp = item.season_number ? `${item.next_up ? 'Up next · ' : ''}S${item.season_number}: Episode ${item.episode_number || 0}` : null;
 
-        const still = (item.still_path || (item.metadata && item.metadata.key_frame))
-            ? `/static/images/stills${(item.still_path || item.metadata.key_frame)}`
+        const still = (item.still_path || item.key_frame)
+            ? `/static/images/stills${(item.still_path || item.key_frame)}`
             : '/static/images/default_poster.jpg';
 
         const brightness = item.watched ? '35%' : '100%';
@@ -119,70 +119,13 @@ async function renderHeroCards(data, elementId) {
 }
 
 
-async function loadItem(id) {
-    const item = await apiFetch(`/content/v1/item/${id}`)
-    const data = await item.json()
-    return data    
-}
-
-async function loadCatalog(data) {
-    const promises = data.map(item => loadItem(item.media_id))
-    const catalog = await Promise.all(promises)
-    catalog.sort((a, b) => new Date(b.new_video_inserted) - new Date(a.new_video_inserted));
-    return catalog
-}
-
-
-
-
-async function loadVideo(id) {
-    const item = await apiFetch(`/content/v1/video/${id}`)
-    const data = await item.json()
-    return data    
-}
-
-async function loadContinueFeed(data) {
-    // group episodes to one series, keep only the most recently viewed episode from series
-    const filteredData = [];
-    const seen = {}; // { media_id: item }
-    
-    for (const item of data) {
-      const mediaId = item.media_id;
-    
-      // If media_id haven't seen yet, or item is more recent
-      if (!seen[mediaId] || item.entry_updated > seen[mediaId].entry_updated) {
-        seen[mediaId] = item;
-      }
-    }
-
-    for (const key in seen) {
-      filteredData.push(seen[key]);
-    }
-    data = filteredData.sort((a, b) => new Date(b.entry_updated) - new Date(a.entry_updated)).slice(0,5);
-    
-    // fetch
-    const promises = data.map(async item => {
-        const apiResult = await loadVideo(item.video_id);
-        return { ...item, ...apiResult }; // merge API result into original item
-    });
-
-    const catalog = await Promise.all(promises);
-    
-    return catalog;
-}
-
-
-
-
 async function loadFeed() {
-    const res = await apiFetch('/accounts/v1/l/a'); 
+    // continue watching / next up and watchlist cards, computed server side
+    const res = await apiFetch('/accounts/v1/feed');
     const data = await res.json();
 
-    const catalog = await loadCatalog(data.library)
-    const videos = await loadContinueFeed(data.videos)
-
-    renderHeroCards(videos, 'hero-sl')
-    renderCatalog(catalog, 'user-new');
+    renderHeroCards(data.continue, 'hero-sl')
+    renderCatalog(data.library, 'user-new');
 }
 
 
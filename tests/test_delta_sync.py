@@ -0,0 +1,80 @@
+"""
+Delta sync of /accounts/v1/l/a: a write made after a tombstone must be in the next ?since= delta.
+Runs in a host timezone away from UTC, where naive utcnow() stamps and the real epoch disagree.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+USER_KEY = 'delta-user'
+
+
+@pytest.fixture(scope='module')
+def client():
+    if not hasattr(time, 'tzset'):
+        pytest.skip('needs time.tzset() to change the host timezone')
+    timezone = os.environ.get('TZ')
+    os.environ['TZ'] = 'Europe/Warsaw'
+    time.tzset()
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix='lms-test-')) # localdb.db is opened relative to the working directory
+    os.environ.setdefault('FLASK_KEY', 'test')
+
+    import jwt
+    from sqlalchemy import insert
+    from database_utils import Session, MediaItem, VideoMetadata, User, UserPlayback, create_localdb
+    from app import app
+
+    create_localdb()
+    with Session() as session:
+        session.execute(insert(User), [{'key': USER_KEY, 'password': 'x'}])
+        session.execute(insert(MediaItem), [{'id': i, 'media_type': 'movie', 'title': f'Movie {i}', 'hash_key': f'm{i}'} for i in (1, 2)])
+        session.execute(insert(VideoMetadata), [{'id': 1, 'media_id': 1, 'hash_key': 'v1', 'file_path': '/v1.mp4'}])
+        session.execute(insert(UserPlayback), [{'user_key': USER_KEY, 'media_id': 1, 'video_id': 1, 'paused_at': 10, 'entry_updated': int(time.time())}])
+        session.commit()
+
+    token = jwt.encode({'exp': int(time.time()) + 3600}, app.secret_key, algorithm='HS256')
+    test_client = app.test_client()
+    with test_client.session_transaction() as s:
+        s['auth'] = True
+        s['key'] = USER_KEY
+    test_client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    yield test_client
+
+    os.chdir(cwd)
+    if timezone is None:
+        os.environ.pop('TZ')
+    else:
+        os.environ['TZ'] = timezone
+    time.tzset()
+
+
+def test_write_after_tombstone_is_in_next_delta(client):
+    from database_utils import DB, delete_metadata_videos
+
+    full = client.get('/accounts/v1/l/a').json
+    assert full['full'] and [v['video_id'] for v in full['videos']] == [1]
+
+    delete_metadata_videos(['v1']) # tombstones the user's playback row
+    delta = client.get(f'/accounts/v1/l/a?since={full["cursor"]}').json
+    assert not delta['full'] and delta['deleted']['videos'] == [1]
+
+    DB.set_user_library(USER_KEY, {'media_id': 2, 'watchlisted': 1})
+    DB.set_user_playback(USER_KEY, {'media_id': 2, 'video_id': 2, 'video_paused_at': 5})
+    delta = client.get(f'/accounts/v1/l/a?since={delta["cursor"]}').json
+    assert not delta['full']
+    assert [i['media_id'] for i in delta['library']] == [2]
+    assert [v['video_id'] for v in delta['videos']] == [2]
+
+
+def test_cursor_ahead_of_the_clock_gets_full_sync(client):
+    data = client.get(f'/accounts/v1/l/a?since={int(time.time()) + 7200}').json
+    assert data['full']
+    assert data['cursor'] <= int(time.time())